@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+def copy_changed_by_details(apps, schema_editor):
+    """Backfill the denormalized user columns for existing history rows"""
+    BranchHistory = apps.get_model('branch', 'BranchHistory')
+    db_alias = schema_editor.connection.alias
+    rows = BranchHistory.objects.using(db_alias).filter(changed_by__isnull=False).select_related('changed_by')
+    for history in rows.iterator():
+        history.changed_by_username = history.changed_by.username
+        history.changed_by_email = history.changed_by.email
+        history.save(update_fields=['changed_by_username', 'changed_by_email'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branch', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branchhistory',
+            name='changed_by_username',
+            field=models.CharField(blank=True, max_length=150, null=True),
+        ),
+        migrations.AddField(
+            model_name='branchhistory',
+            name='changed_by_email',
+            field=models.EmailField(blank=True, max_length=254, null=True),
+        ),
+        migrations.RunPython(copy_changed_by_details, migrations.RunPython.noop),
+    ]
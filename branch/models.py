@@ -1,10 +1,38 @@
 import uuid
 
-from django.db import models
+from django.db import models, router, transaction
 
 from user.models import CustomUser, Tenant, TimestampedModel
 
 
+class BranchManager(models.Manager):
+    def bulk_create_with_history(self, branches, user, batch_size=1000):
+        """
+        Insert branches and their "created" history rows with one bulk INSERT per batch.
+        bulk_create does not send post_save, so history is written here instead of by the signal.
+        """
+        db = router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            branches = self.using(db).bulk_create(branches, batch_size=batch_size)
+            BranchHistory.objects.using(db).bulk_create(
+                [
+                    BranchHistory(
+                        branch=branch,
+                        tenant=branch.tenant,
+                        changed_by=user,
+                        changed_by_username=getattr(user, "username", None),
+                        changed_by_email=getattr(user, "email", None),
+                        action="created",
+                        changes={"all_fields": "Branch created"},
+                        notes="Branch was created",
+                    )
+                    for branch in branches
+                ],
+                batch_size=batch_size,
+            )
+        return branches
+
+
 class Branch(TimestampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="branches")
@@ -35,6 +63,8 @@ class Branch(TimestampedModel):
     )
     notes = models.TextField(blank=True, null=True, help_text="Additional notes about the branch")
 
+    objects = BranchManager()
+
     class Meta:
         indexes = [
             models.Index(fields=["tenant", "name"]),
@@ -51,6 +81,9 @@ class Branch(TimestampedModel):
 class BranchHistory(TimestampedModel):
     """Model to track all changes and updates to Branch records"""
 
+    # Field pointing at the tracked record; used to coalesce buffered history rows
+    subject_field = "branch"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="history")
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="branch_history")
@@ -61,6 +94,9 @@ class BranchHistory(TimestampedModel):
         blank=True,
         related_name="branch_changes",
     )
+    # Copied from changed_by at write time so history reads don't need to join the user table
+    changed_by_username = models.CharField(max_length=150, blank=True, null=True)
+    changed_by_email = models.EmailField(blank=True, null=True)
 
     ACTION_CHOICES = [
         ("created", "Created"),
@@ -80,6 +116,8 @@ class BranchHistory(TimestampedModel):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["branch", "created_at"]),
+            # History list: filter on branch + tenant, newest first
+            models.Index(fields=["branch", "tenant", "-created_at"], name="brhist_cover_idx"),
             models.Index(fields=["tenant", "created_at"]),
             models.Index(fields=["action", "created_at"]),
         ]
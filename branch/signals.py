@@ -1,93 +1,98 @@
 import json
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 
+from crm_saas.history import record_history
 from .models import Branch, BranchHistory
 
 
-def get_field_value(obj, field_name):
-    """Safely get field value, handling ForeignKeys and special fields"""
-    try:
-        field = obj._meta.get_field(field_name)
-        if field.many_to_one:  # ForeignKey
-            value = getattr(obj, field_name)
-            return str(value.id) if value else None
-        if field.many_to_many:
-            return [str(item.id) for item in getattr(obj, field_name).all()]
-        value = getattr(obj, field_name)
-        if value is None:
-            return None
-        if isinstance(value, (dict, list)):
-            return json.dumps(value)
-        return str(value)
-    except Exception:
+TRACKED_FIELDS = (
+    "name",
+    "code",
+    "address",
+    "city",
+    "state",
+    "country",
+    "zip_code",
+    "phone",
+    "email",
+    "manager_name",
+    "manager_email",
+    "manager_phone",
+    "is_active",
+    "notes",
+)
+
+
+def stringify(value):
+    """Convert a raw field value to the string form stored in history"""
+    if value is None:
         return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
 
 
-@receiver(pre_save, sender=Branch)
-def branch_pre_save(sender, instance, **kwargs):
-    """Store the old instance before save to compare changes"""
-    if instance.pk:
-        try:
-            instance._old_instance = Branch.objects.get(pk=instance.pk)
-        except Branch.DoesNotExist:
-            instance._old_instance = None
-    else:
-        instance._old_instance = None
+def take_snapshot(instance, fields=None):
+    """Copy the loaded values of tracked fields (deferred fields are skipped)"""
+    names = TRACKED_FIELDS if fields is None else [name for name in TRACKED_FIELDS if name in fields]
+    return {name: instance.__dict__[name] for name in names if name in instance.__dict__}
+
+
+@receiver(post_init, sender=Branch)
+def branch_post_init(sender, instance, **kwargs):
+    """Snapshot tracked fields on load so updates can be diffed without re-fetching the row"""
+    instance._snapshot = take_snapshot(instance)
 
 
 @receiver(post_save, sender=Branch)
-def branch_post_save(sender, instance, created, **kwargs):
+def branch_post_save(sender, instance, created, update_fields=None, **kwargs):
     """Track changes to Branch model"""
     changed_by = None
     if hasattr(instance, "_changed_by"):
         changed_by = instance._changed_by
     elif hasattr(instance, "created_by") and created:
         changed_by = instance.created_by
+    author = {
+        "changed_by": changed_by,
+        "changed_by_username": getattr(changed_by, "username", None),
+        "changed_by_email": getattr(changed_by, "email", None),
+    }
 
     tenant = instance.tenant
-
-    from django.db import connections
-
-    if hasattr(connections["default"], "tenant"):
-        connections["default"].tenant = tenant
+    old_snapshot = getattr(instance, "_snapshot", None)
+    if update_fields and old_snapshot is not None:
+        # Only the listed columns were written, so only those can have changed
+        written = take_snapshot(instance, update_fields)
+        instance._snapshot = {**old_snapshot, **written}
+        old_snapshot = {name: old_snapshot[name] for name in written if name in old_snapshot}
+    else:
+        instance._snapshot = take_snapshot(instance)
 
     if created:
-        BranchHistory.objects.create(
-            branch=instance,
-            tenant=tenant,
-            changed_by=changed_by,
-            action="created",
-            changes={"all_fields": "Branch created"},
-            notes="Branch was created",
+        record_history(
+            BranchHistory(
+                branch=instance,
+                tenant=tenant,
+                **author,
+                action="created",
+                changes={"all_fields": "Branch created"},
+                notes="Branch was created",
+            )
         )
         return
 
-    old_instance = getattr(instance, "_old_instance", None)
-    if not old_instance:
+    if not old_snapshot:
         return
 
-    tracked_fields = [
-        "name",
-        "code",
-        "address",
-        "city",
-        "state",
-        "country",
-        "zip_code",
-        "phone",
-        "email",
-        "manager_name",
-        "manager_email",
-        "manager_phone",
-        "is_active",
-        "notes",
-    ]
     changes = {}
-    for field_name in tracked_fields:
-        old_value = get_field_value(old_instance, field_name)
-        new_value = get_field_value(instance, field_name)
+    for field_name, raw_old in old_snapshot.items():
+        raw_new = instance.__dict__.get(field_name)
+        if raw_old == raw_new:
+            continue
+        old_value = stringify(raw_old)
+        new_value = stringify(raw_new)
         if old_value != new_value:
             changes[field_name] = {"old": old_value, "new": new_value}
 
@@ -96,29 +101,33 @@ def branch_post_save(sender, instance, created, **kwargs):
 
     # Soft delete
     if "is_active" in changes and changes["is_active"]["new"] == "False":
-        BranchHistory.objects.create(
-            branch=instance,
-            tenant=tenant,
-            changed_by=changed_by,
-            action="deleted",
-            field_name="is_active",
-            old_value=changes["is_active"]["old"],
-            new_value=changes["is_active"]["new"],
-            changes=changes,
-            notes="Branch was soft-deleted",
+        record_history(
+            BranchHistory(
+                branch=instance,
+                tenant=tenant,
+                **author,
+                action="deleted",
+                field_name="is_active",
+                old_value=changes["is_active"]["old"],
+                new_value=changes["is_active"]["new"],
+                changes=dict(changes),
+                notes="Branch was soft-deleted",
+            )
         )
         changes.pop("is_active", None)
 
     if changes:
         changed_fields = list(changes.keys())
-        BranchHistory.objects.create(
-            branch=instance,
-            tenant=tenant,
-            changed_by=changed_by,
-            action="updated",
-            field_name=", ".join(changed_fields) if len(changed_fields) <= 3 else f"{len(changed_fields)} fields",
-            changes=changes,
-            notes=f"Updated fields: {', '.join(changed_fields)}",
+        record_history(
+            BranchHistory(
+                branch=instance,
+                tenant=tenant,
+                **author,
+                action="updated",
+                field_name=", ".join(changed_fields) if len(changed_fields) <= 3 else f"{len(changed_fields)} fields",
+                changes=changes,
+                notes=f"Updated fields: {', '.join(changed_fields)}",
+            )
         )
 
 
@@ -1,11 +1,12 @@
 from django.utils.decorators import method_decorator
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import filters, generics, status
+from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from user.models import CustomUser
+from crm_saas.filters import CachedSearchFilter
+from user.mixins import TenantContextMixin
 
 from .history_serializers import BranchHistorySerializer
 from .models import Branch, BranchHistory
@@ -52,18 +53,15 @@ from .serializers import BranchSerializer
         },
     ),
 )
-class BranchListCreateView(generics.ListCreateAPIView):
+class BranchListCreateView(TenantContextMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BranchSerializer
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [CachedSearchFilter]
     search_fields = ["name", "code", "city", "state", "country", "manager_name", "manager_email"]
 
     def get_queryset(self):
         if not getattr(self.request.user, "tenant", None):
             return Branch.objects.none()
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
         return Branch.objects.filter(tenant=self.request.user.tenant).order_by("-created_at")
 
     def create(self, request, *args, **kwargs):
@@ -72,29 +70,10 @@ class BranchListCreateView(generics.ListCreateAPIView):
         if not getattr(request.user, "tenant", None):
             return Response({"detail": "No tenant associated"}, status=status.HTTP_400_BAD_REQUEST)
 
-        from django.db import connections
-
-        connections["default"].tenant = request.user.tenant
-
-        # Ensure user exists in tenant DB (avoid FK issues in tenant DB context)
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
-        if not tenant_user:
-            tenant_user = CustomUser.objects.create(
-                id=request.user.id,
-                username=request.user.username,
-                email=request.user.email,
-                first_name=request.user.first_name,
-                last_name=request.user.last_name,
-                is_active=request.user.is_active,
-                is_staff=request.user.is_staff,
-                is_superuser=request.user.is_superuser,
-                password=request.user.password,
-                tenant=None,
-            )
-
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        tenant_user = self.get_tenant_user()
         branch = Branch(
             tenant=request.user.tenant,
             created_by=tenant_user,
@@ -102,7 +81,9 @@ class BranchListCreateView(generics.ListCreateAPIView):
         )
         branch._changed_by = tenant_user
         branch.save()
-        return Response(BranchSerializer(branch).data, status=status.HTTP_201_CREATED)
+        # Reuse the validated serializer for the response instead of building a new one
+        serializer.instance = branch
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 @method_decorator(
@@ -117,7 +98,7 @@ class BranchListCreateView(generics.ListCreateAPIView):
     name="delete",
     decorator=swagger_auto_schema(tags=["Branches"], operation_description="Soft delete branch"),
 )
-class BranchDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BranchDetailView(TenantContextMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BranchSerializer
     lookup_field = "pk"
@@ -126,28 +107,17 @@ class BranchDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         if not getattr(self.request.user, "tenant", None):
             return Branch.objects.none()
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
         return Branch.objects.filter(tenant=self.request.user.tenant)
 
     def perform_update(self, serializer):
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
-        tenant_user = CustomUser.objects.filter(id=self.request.user.id).first()
         instance = serializer.instance
-        instance._changed_by = tenant_user if tenant_user else self.request.user
+        instance._changed_by = self.get_tenant_user()
         serializer.save()
 
     def delete(self, request, *args, **kwargs):
         instance = self.get_object()
-        from django.db import connections
-
-        connections["default"].tenant = request.user.tenant
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
         instance.is_active = False
-        instance._changed_by = tenant_user if tenant_user else request.user
+        instance._changed_by = self.get_tenant_user()
         instance.save(update_fields=["is_active", "updated_at"])
         return Response({"message": "Branch soft-deleted"}, status=status.HTTP_200_OK)
 
@@ -156,7 +126,7 @@ class BranchDetailView(generics.RetrieveUpdateDestroyAPIView):
     name="get",
     decorator=swagger_auto_schema(tags=["Branches"], operation_description="Get branch change history"),
 )
-class BranchHistoryView(generics.ListAPIView):
+class BranchHistoryView(TenantContextMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BranchHistorySerializer
     lookup_field = "pk"
@@ -164,17 +134,21 @@ class BranchHistoryView(generics.ListAPIView):
     def get_queryset(self):
         if not getattr(self.request.user, "tenant", None):
             return BranchHistory.objects.none()
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
-        branch_id = self.kwargs.get("pk")
-        try:
-            branch = Branch.objects.get(id=branch_id, tenant=self.request.user.tenant)
-        except Branch.DoesNotExist:
-            return BranchHistory.objects.none()
+        # An unknown or foreign branch id simply matches no history rows
         return (
-            BranchHistory.objects.filter(branch=branch, tenant=self.request.user.tenant)
-            .select_related("changed_by")
+            BranchHistory.objects.filter(branch_id=self.kwargs.get("pk"), tenant=self.request.user.tenant)
+            .only(
+                "id",
+                "action",
+                "field_name",
+                "old_value",
+                "new_value",
+                "changes",
+                "notes",
+                "created_at",
+                "changed_by_username",
+                "changed_by_email",
+            )
             .order_by("-created_at")
         )
 
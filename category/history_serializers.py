@@ -1,11 +1,9 @@
 from rest_framework import serializers
+from crm_saas.serializers import CachedFieldsMixin
 from .models import CategoryHistory
 
 
-class CategoryHistorySerializer(serializers.ModelSerializer):
-    changed_by_username = serializers.SerializerMethodField()
-    changed_by_email = serializers.SerializerMethodField()
-    
+class CategoryHistorySerializer(CachedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CategoryHistory
         fields = [
@@ -14,11 +12,3 @@ class CategoryHistorySerializer(serializers.ModelSerializer):
             'created_at'
         ]
         read_only_fields = ['id', 'created_at']
-    
-    def get_changed_by_username(self, obj):
-        return obj.changed_by.username if obj.changed_by else None
-    
-    def get_changed_by_email(self, obj):
-        return obj.changed_by.email if obj.changed_by else None
-
-
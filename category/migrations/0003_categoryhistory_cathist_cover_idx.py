@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-16 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0002_categoryhistory_changed_by_username_and_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoryhistory',
+            index=models.Index(fields=['category', 'tenant', '-created_at'], name='cathist_cover_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-16 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0003_categoryhistory_cathist_cover_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['tenant', '-created_at'], name='cat_tenant_created_idx'),
+        ),
+    ]
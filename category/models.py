@@ -36,6 +36,8 @@ class Category(TimestampedModel):
             models.Index(fields=["tenant", "code"]),
             models.Index(fields=["tenant", "parent"]),
             models.Index(fields=["tenant", "is_active"]),
+            # List page: newest first within a tenant
+            models.Index(fields=["tenant", "-created_at"], name="cat_tenant_created_idx"),
         ]
         unique_together = [("tenant", "code")]
         verbose_name = "Category"
@@ -47,6 +49,9 @@ class Category(TimestampedModel):
 
 class CategoryHistory(TimestampedModel):
     """Model to track all changes and updates to Category records"""
+
+    # Field pointing at the tracked record; used to coalesce buffered history rows
+    subject_field = "category"
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="history")
@@ -58,6 +63,9 @@ class CategoryHistory(TimestampedModel):
         blank=True,
         related_name="category_changes",
     )
+    # Copied from changed_by at write time so history reads don't need to join the user table
+    changed_by_username = models.CharField(max_length=150, blank=True, null=True)
+    changed_by_email = models.EmailField(blank=True, null=True)
     
     ACTION_CHOICES = [
         ("created", "Created"),
@@ -77,6 +85,8 @@ class CategoryHistory(TimestampedModel):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["category", "created_at"]),
+            # History list: filter on category + tenant, newest first
+            models.Index(fields=["category", "tenant", "-created_at"], name="cathist_cover_idx"),
             models.Index(fields=["tenant", "created_at"]),
             models.Index(fields=["action", "created_at"]),
         ]
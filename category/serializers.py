@@ -1,10 +1,12 @@
 from rest_framework import serializers
+from crm_saas.serializers import CachedFieldsMixin
 from .models import Category
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(CachedFieldsMixin, serializers.ModelSerializer):
     parent_name = serializers.CharField(source='parent.name', read_only=True)
-    children_count = serializers.SerializerMethodField()
+    # Annotated by the views' querysets; unsaved/unannotated instances report 0
+    children_count = serializers.IntegerField(read_only=True, default=0)
     
     class Meta:
         model = Category
@@ -19,11 +21,10 @@ class CategorySerializer(serializers.ModelSerializer):
             'parent': {'required': False, 'allow_null': True},
             'is_active': {'required': False, 'default': True},
         }
-    
-    def get_children_count(self, obj):
-        """Get the number of child categories"""
-        if hasattr(obj, 'children'):
-            return obj.children.filter(is_active=True).count()
-        return 0
-
 
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Write only the submitted columns; the history signal then diffs just those
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
@@ -1,45 +1,43 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
+from crm_saas.history import record_history
 from .models import Category, CategoryHistory
 import json
 
 
-def get_field_value(obj, field_name):
-    """Safely get field value, handling ForeignKeys and special fields"""
-    try:
-        field = obj._meta.get_field(field_name)
-        if field.many_to_one:  # ForeignKey
-            value = getattr(obj, field_name)
-            return str(value.id) if value else None
-        elif field.many_to_many:
-            return [str(item.id) for item in getattr(obj, field_name).all()]
-        else:
-            value = getattr(obj, field_name)
-            # Convert to string for storage, handling None
-            if value is None:
-                return None
-            if isinstance(value, (dict, list)):
-                return json.dumps(value)
-            return str(value)
-    except Exception:
+TRACKED_FIELDS = ('name', 'code', 'description', 'parent', 'is_active', 'notes')
+
+# Foreign keys hold their raw value under the attname (e.g. parent -> parent_id)
+TRACKED_ATTNAMES = {name: Category._meta.get_field(name).attname for name in TRACKED_FIELDS}
+
+
+def stringify(value):
+    """Convert a raw field value to the string form stored in history"""
+    if value is None:
         return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
 
 
-@receiver(pre_save, sender=Category)
-def category_pre_save(sender, instance, **kwargs):
-    """Store the old instance before save to compare changes"""
-    if instance.pk:
-        try:
-            old_instance = Category.objects.get(pk=instance.pk)
-            instance._old_instance = old_instance
-        except Category.DoesNotExist:
-            instance._old_instance = None
-    else:
-        instance._old_instance = None
+def take_snapshot(instance, fields=None):
+    """Copy the loaded values of tracked fields (deferred fields are skipped)"""
+    return {
+        name: instance.__dict__[attname]
+        for name, attname in TRACKED_ATTNAMES.items()
+        if attname in instance.__dict__
+        and (fields is None or name in fields or attname in fields)
+    }
+
+
+@receiver(post_init, sender=Category)
+def category_post_init(sender, instance, **kwargs):
+    """Snapshot tracked fields on load so updates can be diffed without re-fetching the row"""
+    instance._snapshot = take_snapshot(instance)
 
 
 @receiver(post_save, sender=Category)
-def category_post_save(sender, instance, created, **kwargs):
+def category_post_save(sender, instance, created, update_fields=None, **kwargs):
     """Track changes to Category model"""
     # Get the user from the request if available
     changed_by = None
@@ -47,36 +45,45 @@ def category_post_save(sender, instance, created, **kwargs):
         changed_by = instance._changed_by
     elif hasattr(instance, 'created_by') and created:
         changed_by = instance.created_by
+    author = {
+        'changed_by': changed_by,
+        'changed_by_username': getattr(changed_by, 'username', None),
+        'changed_by_email': getattr(changed_by, 'email', None),
+    }
     
     tenant = instance.tenant
-    
-    # Ensure we're in the tenant database context
-    from django.db import connections
-    if hasattr(connections['default'], 'tenant'):
-        connections['default'].tenant = tenant
+    old_snapshot = getattr(instance, '_snapshot', None)
+    if update_fields and old_snapshot is not None:
+        # Only the listed columns were written, so only those can have changed
+        written = take_snapshot(instance, update_fields)
+        instance._snapshot = {**old_snapshot, **written}
+        old_snapshot = {name: old_snapshot[name] for name in written if name in old_snapshot}
+    else:
+        instance._snapshot = take_snapshot(instance)
     
     if created:
         # Record creation
-        CategoryHistory.objects.create(
-            category=instance,
-            tenant=tenant,
-            changed_by=changed_by,
-            action='created',
-            changes={'all_fields': 'Category created'},
-            notes='Category was created'
+        record_history(
+            CategoryHistory(
+                category=instance,
+                tenant=tenant,
+                **author,
+                action='created',
+                changes={'all_fields': 'Category created'},
+                notes='Category was created'
+            )
         )
     else:
         # Record updates
-        old_instance = getattr(instance, '_old_instance', None)
-        if old_instance:
+        if old_snapshot:
             changes = {}
-            tracked_fields = [
-                'name', 'code', 'description', 'parent', 'is_active', 'notes'
-            ]
-            
-            for field_name in tracked_fields:
-                old_value = get_field_value(old_instance, field_name)
-                new_value = get_field_value(instance, field_name)
+            for field_name, raw_old in old_snapshot.items():
+                raw_new = instance.__dict__.get(TRACKED_ATTNAMES[field_name])
+                # Equal raw values always stringify the same; skip the conversion
+                if raw_old == raw_new:
+                    continue
+                old_value = stringify(raw_old)
+                new_value = stringify(raw_new)
                 
                 if old_value != new_value:
                     changes[field_name] = {
@@ -87,30 +94,34 @@ def category_post_save(sender, instance, created, **kwargs):
             if changes:
                 # Check if this is a soft delete (is_active changed to False)
                 if 'is_active' in changes and changes['is_active']['new'] == 'False':
-                    CategoryHistory.objects.create(
-                        category=instance,
-                        tenant=tenant,
-                        changed_by=changed_by,
-                        action='deleted',
-                        field_name='is_active',
-                        old_value=changes['is_active']['old'],
-                        new_value=changes['is_active']['new'],
-                        changes=changes,
-                        notes='Category was soft-deleted'
+                    record_history(
+                        CategoryHistory(
+                            category=instance,
+                            tenant=tenant,
+                            **author,
+                            action='deleted',
+                            field_name='is_active',
+                            old_value=changes['is_active']['old'],
+                            new_value=changes['is_active']['new'],
+                            changes=dict(changes),
+                            notes='Category was soft-deleted'
+                        )
                     )
                     changes.pop('is_active', None)
                 
                 # Record other changes if any
                 if changes:
                     changed_fields = list(changes.keys())
-                    CategoryHistory.objects.create(
-                        category=instance,
-                        tenant=tenant,
-                        changed_by=changed_by,
-                        action='updated',
-                        field_name=', '.join(changed_fields) if len(changed_fields) <= 3 else f"{len(changed_fields)} fields",
-                        changes=changes,
-                        notes=f"Updated fields: {', '.join(changed_fields)}"
+                    record_history(
+                        CategoryHistory(
+                            category=instance,
+                            tenant=tenant,
+                            **author,
+                            action='updated',
+                            field_name=', '.join(changed_fields) if len(changed_fields) <= 3 else f"{len(changed_fields)} fields",
+                            changes=changes,
+                            notes=f"Updated fields: {', '.join(changed_fields)}"
+                        )
                     )
 
 
@@ -1,3 +1,4 @@
+from django.db.models import Count, Q
 from django.utils.decorators import method_decorator
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -5,13 +6,18 @@ from rest_framework import filters, generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from user.models import CustomUser
+from user.mixins import TenantContextMixin
 
 from .history_serializers import CategoryHistorySerializer
 from .models import Category, CategoryHistory
 from .serializers import CategorySerializer
 
 
+def annotate_children_count(queryset):
+    """Annotate each category with its number of active children in the same query"""
+    return queryset.annotate(children_count=Count("children", filter=Q(children__is_active=True)))
+
+
 @method_decorator(
     name="get",
     decorator=swagger_auto_schema(
@@ -52,7 +58,7 @@ from .serializers import CategorySerializer
         },
     ),
 )
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(TenantContextMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CategorySerializer
     filter_backends = [filters.SearchFilter]
@@ -61,10 +67,23 @@ class CategoryListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         if not getattr(self.request.user, "tenant", None):
             return Category.objects.none()
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
-        return Category.objects.filter(tenant=self.request.user.tenant).order_by("-created_at")
+        # Only the columns CategorySerializer renders; tenant/created_by are never read here
+        queryset = (
+            Category.objects.filter(tenant=self.request.user.tenant)
+            .select_related("parent")
+            .only(
+                "id",
+                "name",
+                "code",
+                "description",
+                "parent__name",
+                "is_active",
+                "notes",
+                "created_at",
+                "updated_at",
+            )
+        )
+        return annotate_children_count(queryset).order_by("-created_at")
 
     def create(self, request, *args, **kwargs):
         if not request.user or not request.user.is_authenticated:
@@ -72,25 +91,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
         if not getattr(request.user, "tenant", None):
             return Response({"detail": "No tenant associated"}, status=status.HTTP_400_BAD_REQUEST)
 
-        from django.db import connections
-
-        connections["default"].tenant = request.user.tenant
-
-        # Ensure user exists in tenant DB (avoid FK issues in tenant DB context)
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
-        if not tenant_user:
-            tenant_user = CustomUser.objects.create(
-                id=request.user.id,
-                username=request.user.username,
-                email=request.user.email,
-                first_name=request.user.first_name,
-                last_name=request.user.last_name,
-                is_active=request.user.is_active,
-                is_staff=request.user.is_staff,
-                is_superuser=request.user.is_superuser,
-                password=request.user.password,
-                tenant=None,
-            )
+        tenant_user = self.get_tenant_user()
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -103,7 +104,9 @@ class CategoryListCreateView(generics.ListCreateAPIView):
         # Attach user for history tracking
         category._changed_by = tenant_user
         category.save()
-        return Response(CategorySerializer(category).data, status=status.HTTP_201_CREATED)
+        # Reuse the validated serializer for the response instead of building a new one
+        serializer.instance = category
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 @method_decorator(
@@ -150,7 +153,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
         },
     ),
 )
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(TenantContextMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CategorySerializer
     lookup_field = "pk"
@@ -159,30 +162,19 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         if not getattr(self.request.user, "tenant", None):
             return Category.objects.none()
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
-        return Category.objects.filter(tenant=self.request.user.tenant)
+        return annotate_children_count(
+            Category.objects.filter(tenant=self.request.user.tenant).select_related("parent")
+        )
 
     def perform_update(self, serializer):
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
-        # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=self.request.user.id).first()
         instance = serializer.instance
-        instance._changed_by = tenant_user if tenant_user else self.request.user
+        instance._changed_by = self.get_tenant_user()
         serializer.save()
 
     def delete(self, request, *args, **kwargs):
         instance = self.get_object()
-        from django.db import connections
-
-        connections["default"].tenant = self.request.user.tenant
-        # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
         instance.is_active = False
-        instance._changed_by = tenant_user if tenant_user else request.user
+        instance._changed_by = self.get_tenant_user()
         instance.save(update_fields=["is_active", "updated_at"])
         # History will be tracked by the signal
         return Response({"message": "Category soft-deleted"}, status=status.HTTP_200_OK)
@@ -237,7 +229,7 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         },
     ),
 )
-class CategoryHistoryView(generics.ListAPIView):
+class CategoryHistoryView(TenantContextMixin, generics.ListAPIView):
     """API endpoint to retrieve history of changes for a specific category"""
     permission_classes = [IsAuthenticated]
     serializer_class = CategoryHistorySerializer
@@ -247,9 +239,6 @@ class CategoryHistoryView(generics.ListAPIView):
         if not getattr(self.request.user, "tenant", None):
             return CategoryHistory.objects.none()
         
-        from django.db import connections
-        connections["default"].tenant = self.request.user.tenant
-        
         category_id = self.kwargs.get("pk")
         
         # Verify category exists and belongs to tenant
@@ -258,9 +247,21 @@ class CategoryHistoryView(generics.ListAPIView):
         except Category.DoesNotExist:
             return CategoryHistory.objects.none()
         
-        return CategoryHistory.objects.filter(
-            category=category,
-            tenant=self.request.user.tenant
-        ).select_related("changed_by").order_by("-created_at")
+        return (
+            CategoryHistory.objects.filter(category=category, tenant=self.request.user.tenant)
+            .only(
+                "id",
+                "action",
+                "field_name",
+                "old_value",
+                "new_value",
+                "changes",
+                "notes",
+                "created_at",
+                "changed_by_username",
+                "changed_by_email",
+            )
+            .order_by("-created_at")
+        )
 
 
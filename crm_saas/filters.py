@@ -0,0 +1,63 @@
+import operator
+from functools import reduce
+
+from django.db import models
+from rest_framework.filters import SearchFilter
+
+
+class CachedSearchFilter(SearchFilter):
+    """
+    SearchFilter that resolves the ORM lookups for a view's search_fields once per model
+    instead of on every request, and returns the queryset untouched when no search term is
+    given. Matching behaviour is the same as DRF's SearchFilter.
+    """
+    _lookup_cache = {}
+
+    def get_orm_lookups(self, search_fields, queryset):
+        key = (queryset.model, tuple(search_fields))
+        cached = self._lookup_cache.get(key)
+        if cached is None:
+            orm_lookups = tuple(self.construct_search(str(field), queryset) for field in search_fields)
+            cached = (orm_lookups, self.must_call_distinct(queryset, search_fields))
+            self._lookup_cache[key] = cached
+        return cached
+
+    def filter_queryset(self, request, queryset, view):
+        # Most list requests carry no search term; skip resolving fields and parsing terms for them
+        if not request.query_params.get(self.search_param, '').strip():
+            return queryset
+
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        orm_lookups, call_distinct = self.get_orm_lookups(search_fields, queryset)
+        base = queryset
+        conditions = (
+            reduce(operator.or_, (models.Q(**{orm_lookup: term}) for orm_lookup in orm_lookups))
+            for term in search_terms
+        )
+        queryset = queryset.filter(reduce(operator.and_, conditions))
+
+        if call_distinct:
+            queryset = queryset.filter(pk=models.OuterRef('pk'))
+            queryset = base.filter(models.Exists(queryset))
+        return queryset
+
+
+class ScopedSearchFilter(CachedSearchFilter):
+    """
+    CachedSearchFilter that lets the client narrow a search to one column with
+    ``?search_field=<name>``, matched as a prefix (``istartswith``) so an index on that column
+    can serve it. Only columns listed in the view's ``scoped_search_fields`` are accepted;
+    without the parameter every ``search_fields`` entry is searched as before.
+    """
+    search_field_param = 'search_field'
+
+    def get_search_fields(self, view, request):
+        field = request.query_params.get(self.search_field_param)
+        if field and field in getattr(view, 'scoped_search_fields', ()):
+            return ['^' + field]
+        return super().get_search_fields(view, request)
@@ -0,0 +1,152 @@
+"""
+Request-scoped buffering of audit history rows (Branch, Category, ...).
+
+Signal handlers hand unsaved history rows to ``record_history``; inside a request they are
+collected and HistoryContextMiddleware writes them in bulk once the view has returned.
+
+Trade-off: the history INSERT no longer runs in the same transaction as the data write it
+describes. Rows are only collected once that write has committed, so a rolled-back change never
+gets history, but the reverse is possible: if the history INSERT itself fails (even after the
+row-by-row retry) the change stays committed without its audit row. Such rows are logged at
+ERROR level with their full content so they can be alerted on and replayed.
+"""
+import logging
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+# Unsaved history rows collected while a request is being handled.
+# None means no request scope is active and rows must be written immediately.
+_history_buffer = ContextVar("history_buffer", default=None)
+
+HISTORY_BATCH_SIZE = 500
+
+
+def buffer_history(history):
+    """Queue an unsaved history row for the current request; returns False outside a request"""
+    buffer = _history_buffer.get()
+    if buffer is None:
+        return False
+    # The row only joins the buffer once the write it describes has committed: inside an atomic
+    # block on the tenant database this waits for the outermost commit and is dropped on rollback
+    transaction.on_commit(partial(buffer.append, history), using=router.db_for_write(type(history)))
+    return True
+
+
+def record_history(history):
+    """Buffer the history row when a request scope is active, otherwise save it right away"""
+    if not buffer_history(history):
+        history.save()
+
+
+def _coalesce_key(history):
+    """Rows for the same record touching the same fields can be folded; creations never are"""
+    if history.action == "created":
+        return None
+    changes = history.changes
+    if not changes or not all(isinstance(diff, dict) and diff.keys() == {"old", "new"} for diff in changes.values()):
+        return None
+    subject_id = history.serializable_value(history.subject_field)
+    return (type(history), subject_id, tuple(sorted(changes)))
+
+
+def coalesce_history(buffer):
+    """
+    Fold history rows that describe repeated changes to the same fields of one record
+    within a request into their net change, dropping rows whose net change is a no-op
+    (e.g. is_active switched off and back on).
+    """
+    groups = {}
+    for position, history in enumerate(buffer):
+        key = _coalesce_key(history)
+        groups.setdefault(position if key is None else key, []).append((position, history))
+
+    coalesced = []
+    for rows in groups.values():
+        position, latest = rows[-1]
+        if len(rows) > 1:
+            first = rows[0][1]
+            net = {
+                field: {"old": first.changes[field]["old"], "new": diff["new"]}
+                for field, diff in latest.changes.items()
+            }
+            net = {field: diff for field, diff in net.items() if diff["old"] != diff["new"]}
+            if not net:
+                continue
+            latest.changes = net
+            if latest.action == "deleted" and latest.field_name in net:
+                latest.old_value = net[latest.field_name]["old"]
+                latest.new_value = net[latest.field_name]["new"]
+            elif latest.action == "updated":
+                # Describe only the fields that still changed, as the signal handlers do
+                changed_fields = list(net)
+                latest.field_name = (
+                    ", ".join(changed_fields) if len(changed_fields) <= 3 else f"{len(changed_fields)} fields"
+                )
+                latest.notes = f"Updated fields: {', '.join(changed_fields)}"
+        coalesced.append((position, latest))
+    # Keep rows in the order their final version was recorded
+    coalesced.sort(key=lambda entry: entry[0])
+    return [history for _position, history in coalesced]
+
+
+def _insert_history(model, rows):
+    """Bulk insert ``rows``, falling back to one INSERT per row so a bad row only loses itself"""
+    try:
+        model.objects.bulk_create(rows, batch_size=HISTORY_BATCH_SIZE)
+        return
+    except Exception:
+        logger.warning("Bulk insert of %d %s rows failed, retrying row by row", len(rows), model.__name__, exc_info=True)
+    for history in rows:
+        try:
+            history.save(force_insert=True)
+        except Exception:
+            logger.exception(
+                "Lost %s row %s (tenant %s, action %s, changes %r)",
+                model.__name__, history.pk, history.tenant_id, history.action, history.changes,
+            )
+
+
+def flush_history(buffer):
+    """Write buffered history rows with one bulk INSERT per model and tenant"""
+    grouped = defaultdict(list)
+    for history in coalesce_history(buffer):
+        grouped[(type(history), history.tenant_id)].append(history)
+    buffer.clear()
+
+    tenant = getattr(connections["default"], "tenant", None)
+    try:
+        for (model, _tenant_id), rows in grouped.items():
+            # Route the INSERT to the tenant database the rows belong to
+            connections["default"].tenant = rows[0].tenant
+            _insert_history(model, rows)
+    finally:
+        connections["default"].tenant = tenant
+
+
+class HistoryContextMiddleware:
+    """
+    Collect history rows during a request and write them in bulk once the response is ready. Only rows for committed writes are collected, and nothing is written
+    for a request whose view raised.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        buffer = []
+        token = _history_buffer.set(buffer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _history_buffer.reset(token)
+        if buffer and not getattr(request, "_history_view_failed", False):
+            flush_history(buffer)
+        return response
+
+    def process_exception(self, request, exception):
+        request._history_view_failed = True
@@ -1,4 +1,15 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first. Each page is a range seek on the
+    (tenant, created_at) indexes, so deep pages cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -6,8 +17,23 @@ class CustomPageNumberPagination(PageNumberPagination):
     Custom pagination class that allows clients to control page size.
     Default page size: 20
     Max page size: 100 (to prevent abuse)
+
+    Clients that send ?cursor= (empty for the first page) get CustomCursorPagination pages
+    instead, which avoid the growing OFFSET scan of deep page numbers.
     """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    cursor_query_param = 'cursor'
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = CustomCursorPagination()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
 
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
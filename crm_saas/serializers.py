@@ -0,0 +1,18 @@
+import copy
+
+
+class CachedFieldsMixin:
+    """
+    Build a ModelSerializer's declared + model-derived fields once per class and hand each
+    instance shallow copies, instead of re-running model introspection on every instantiation.
+    Only suitable for serializers whose fields do not depend on context or instance.
+    """
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        fields = self._fields_cache.get(cls)
+        if fields is None:
+            fields = super().get_fields()
+            self._fields_cache[cls] = fields
+        return {name: copy.copy(field) for name, field in fields.items()}
@@ -72,6 +72,7 @@ MIDDLEWARE = [
     'user.middleware.TenantMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'user.middleware.HistoryMiddleware',
+    'crm_saas.history.HistoryContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -113,9 +114,16 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        # Keep connections open across requests (seconds)
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Persistent connection lifetime for the per-tenant aliases. Every worker thread can hold one
+# connection per tenant it has served, so this defaults to closing them after each request
+TENANT_DB_CONN_MAX_AGE = int(os.getenv('TENANT_DB_CONN_MAX_AGE', '0'))
+
 # Database routing for multi-tenancy
 DATABASE_ROUTERS = ['user.routers.TenantDatabaseRouter']
 
@@ -1,12 +1,13 @@
 from rest_framework import serializers
+from crm_saas.serializers import CachedFieldsMixin
 from .models import CustomerHistory
-from user.models import CustomUser
 
 
-class CustomerHistorySerializer(serializers.ModelSerializer):
+class CustomerHistorySerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Serializer for CustomerHistory model"""
-    changed_by_username = serializers.CharField(source='changed_by.username', read_only=True)
-    changed_by_email = serializers.CharField(source='changed_by.email', read_only=True)
+    # Annotated by CustomerHistoryView from the joined user row
+    changed_by_username = serializers.CharField(read_only=True)
+    changed_by_email = serializers.CharField(read_only=True)
     
     class Meta:
         model = CustomerHistory
@@ -1,21 +1,44 @@
 import csv
-from typing import Iterator, Dict, List, Tuple
+import io
+from functools import lru_cache
+from typing import Iterator, Dict, Tuple
+
+
+_KEY_MAP = {
+    'name': ['name', 'full_name', 'customer_name'],
+    'email': ['email', 'e-mail'],
+    'phone': ['phone', 'mobile', 'contact_number'],
+    'company': ['company', 'organization'],
+    'address': ['address', 'street'],
+    'city': ['city'],
+    'state': ['state', 'province'],
+    'country': ['country'],
+    'zip_code': ['zip_code', 'zipcode', 'postal_code'],
+    'is_active': ['is_active', 'active'],
+}
+# Lower-cased header -> (target field, candidate priority), built once instead of per row
+_FIELD_MAP = {
+    candidate: (target, rank)
+    for target, candidates in _KEY_MAP.items()
+    for rank, candidate in enumerate(candidates)
+}
+_IS_ACTIVE_TRUE = frozenset(('1', 'true', 'yes', 'y'))
 
 
 def _read_csv(file_obj) -> Iterator[Dict[str, str]]:
     file_obj.seek(0)
-    # Attempt to decode as utf-8; if bytes are passed, wrap accordingly
+    if isinstance(file_obj, io.TextIOBase):
+        text = file_obj
+    else:
+        # Decode incrementally as the reader pulls lines instead of reading the whole upload
+        text = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
     try:
-        text = file_obj.read().decode('utf-8')
-    except AttributeError:
-        # Already str
-        text = file_obj.read()
-    if isinstance(text, bytes):
-        text = text.decode('utf-8')
-    lines = text.splitlines()
-    reader = csv.DictReader(lines)
-    for row in reader:
-        yield {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k is not None}
+        for row in csv.DictReader(text):
+            yield {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k is not None}
+    finally:
+        if text is not file_obj:
+            # Leave the uploaded file open for the caller
+            text.detach()
 
 
 def _read_xlsx(file_obj) -> Iterator[Dict[str, str]]:
@@ -27,64 +50,57 @@ def _read_xlsx(file_obj) -> Iterator[Dict[str, str]]:
     from openpyxl import load_workbook
     wb = load_workbook(filename=file_obj, read_only=True, data_only=True)
     ws = wb.active
-    rows = ws.iter_rows(values_only=True)
-    headers = None
-    for idx, row in enumerate(rows):
-        if idx == 0:
-            headers = [str(h).strip() if h is not None else '' for h in row]
-            continue
-        if not headers:
-            continue
-        values = list(row)
+    rows = ws.values
+    headers = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+    if not headers:
+        return
+    # Resolve the non-empty header positions once instead of re-checking them per cell
+    columns = [(i, h) for i, h in enumerate(headers) if h]
+    width = len(headers)
+    # openpyxl yields exact built-in types, so an identity check on type is enough
+    strip = str.strip
+    for row in rows:
+        if len(row) < width:
+            row = row + (None,) * (width - len(row))
         data = {}
-        for i, h in enumerate(headers):
-            if not h:
-                continue
-            val = values[i] if i < len(values) else None
-            data[h] = str(val).strip() if isinstance(val, str) else val
+        for i, h in columns:
+            val = row[i]
+            data[h] = strip(val) if type(val) is str else val
         yield data
 
 
-def detect_and_parse_tabular(file_obj, filename: str) -> Tuple[List[Dict[str, str]], str]:
+def detect_and_parse_tabular(file_obj, filename: str) -> Tuple[Iterator[Dict[str, str]], str]:
+    """Return a lazy row iterator and the detected format; parse errors surface while iterating"""
     name = (filename or '').lower()
-    if name.endswith('.csv'):
-        rows = list(_read_csv(file_obj))
-        return rows, 'csv'
     if name.endswith('.xlsx') or name.endswith('.xlsm'):
-        rows = list(_read_xlsx(file_obj))
-        return rows, 'xlsx'
-    # Fallback: try CSV
-    rows = list(_read_csv(file_obj))
-    return rows, 'csv'
+        return _read_xlsx(file_obj), 'xlsx'
+    # CSV, and the fallback for unknown extensions
+    return _read_csv(file_obj), 'csv'
+
+
+@lru_cache(maxsize=64)
+def _resolve_headers(keys: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    """Map a file's headers to (header, target field) pairs, once per distinct header row"""
+    resolved: Dict[str, Tuple[str, int]] = {}
+    for key in keys:
+        match = _FIELD_MAP.get(str(key).strip().lower())
+        if match is None:
+            continue
+        target, rank = match
+        # Earlier candidates in _KEY_MAP win when a row carries several aliases of one field
+        if target in resolved and resolved[target][1] <= rank:
+            continue
+        resolved[target] = (key, rank)
+    return tuple((key, target) for target, (key, _rank) in resolved.items())
 
 
 def normalize_customer_row(row: Dict[str, str]) -> Dict[str, object]:
-    key_map = {
-        'name': ['name', 'full_name', 'customer_name'],
-        'email': ['email', 'e-mail'],
-        'phone': ['phone', 'mobile', 'contact_number'],
-        'company': ['company', 'organization'],
-        'address': ['address', 'street'],
-        'city': ['city'],
-        'state': ['state', 'province'],
-        'country': ['country'],
-        'zip_code': ['zip_code', 'zipcode', 'postal_code'],
-        'is_active': ['is_active', 'active'],
-    }
     output: Dict[str, object] = {}
-    lowered = {str(k).strip().lower(): v for k, v in row.items()}
-    for target, candidates in key_map.items():
-        for ck in candidates:
-            if ck in lowered:
-                val = lowered[ck]
-                if target == 'is_active':
-                    if isinstance(val, str):
-                        output[target] = val.strip().lower() in ('1', 'true', 'yes', 'y')
-                    else:
-                        output[target] = bool(val)
-                else:
-                    output[target] = val
-                break
+    # Every row of a file shares its headers, so the alias matching is only done for the first one
+    for key, target in _resolve_headers(tuple(row)):
+        val = row[key]
+        if target == 'is_active':
+            output[target] = val.strip().lower() in _IS_ACTIVE_TRUE if isinstance(val, str) else bool(val)
+        else:
+            output[target] = val
     return output
-
-
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-16 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0005_customerhistory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['tenant', '-created_at'], name='cust_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['tenant', 'is_active', '-created_at'], name='cust_tenant_active_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated manually to store customer history in compressed InnoDB pages
+
+from django.db import migrations
+
+
+def set_row_format(row_format):
+    def apply(apps, schema_editor):
+        # Table options are InnoDB specific; other backends keep their default storage
+        if schema_editor.connection.vendor != 'mysql':
+            return
+        table = apps.get_model('customer', 'CustomerHistory')._meta.db_table
+        schema_editor.execute(f'ALTER TABLE {schema_editor.quote_name(table)} {row_format}')
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0006_customer_list_indexes'),
+    ]
+
+    operations = [
+        # History is append-only and rarely read; the JSON/text columns shrink 2-4x compressed
+        migrations.RunPython(
+            set_row_format('ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8'),
+            set_row_format('ROW_FORMAT=DYNAMIC'),
+            atomic=False,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-16 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0007_compress_customerhistory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['tenant', 'company'], name='cust_tenant_company_idx'),
+        ),
+    ]
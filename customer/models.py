@@ -1,8 +1,70 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from user.models import Tenant, TimestampedModel, CustomUser
 import uuid
 
 
+class CustomerManager(models.Manager):
+    # Columns an upsert overwrites on an existing (tenant, email) row
+    UPSERT_FIELDS = ('name', 'phone', 'company', 'address', 'city', 'state', 'country', 'zip_code', 'is_active', 'created_by')
+
+    def upsert_with_history(self, customers, user, batch_size=1000):
+        """
+        Insert or update unsaved customers matched on (tenant, email) with one bulk upsert, and
+        write the history rows the post_save signal would have produced (bulk writes send no signals).
+        All customers must share one tenant and have distinct emails. Returns (created, updated).
+        """
+        from .signals import diff_snapshots, history_for_changes, take_snapshot
+
+        if not customers:
+            return 0, 0
+        db = router.db_for_write(self.model)
+        tenant = customers[0].tenant
+        with transaction.atomic(using=db):
+            # Current values are still needed to diff updates for history; stream them in chunks
+            # rather than filling a result cache next to the dict
+            existing = {}
+            matches = self.using(db).filter(tenant=tenant, email__in=[c.email for c in customers])
+            for customer in matches.iterator(chunk_size=batch_size):
+                # Share the batch's tenant so history rows don't load it once per customer
+                customer.tenant = tenant
+                existing[customer.email.lower()] = customer
+            created, history = [], []
+            for customer in customers:
+                current = existing.get(customer.email.lower())
+                if current is None:
+                    created.append(customer)
+                    continue
+                old_snapshot = take_snapshot(current)
+                for field_name in self.UPSERT_FIELDS:
+                    setattr(current, field_name, getattr(customer, field_name))
+                changes = diff_snapshots(old_snapshot, take_snapshot(current))
+                history.extend(history_for_changes(current, changes, user))
+
+            # INSERT ... ON DUPLICATE KEY UPDATE: rows hitting the (tenant, email) key keep their
+            # id, email and created_at and take the imported values
+            connection = connections[db]
+            self.using(db).bulk_create(
+                customers,
+                batch_size=batch_size,
+                update_conflicts=True,
+                update_fields=self.UPSERT_FIELDS + ('updated_at',),
+                unique_fields=['tenant', 'email'] if connection.features.supports_update_conflicts_with_target else None,
+            )
+            history[:0] = [
+                CustomerHistory(
+                    customer=customer,
+                    tenant=customer.tenant,
+                    changed_by=user,
+                    action='created',
+                    changes={'all_fields': 'Customer created'},
+                    notes='Customer was created'
+                )
+                for customer in created
+            ]
+            CustomerHistory.objects.using(db).bulk_create(history, batch_size=batch_size)
+        return len(created), len(customers) - len(created)
+
+
 class Customer(TimestampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='customers')
@@ -18,10 +80,17 @@ class Customer(TimestampedModel):
     zip_code = models.CharField(max_length=20, blank=True, null=True)
     is_active = models.BooleanField(default=True)
 
+    objects = CustomerManager()
+
     class Meta:
         indexes = [
             models.Index(fields=['tenant', 'name']),
             models.Index(fields=['tenant', 'email']),
+            # Prefix search on company (?search_field=company)
+            models.Index(fields=['tenant', 'company'], name='cust_tenant_company_idx'),
+            # List pages: newest first within a tenant, optionally only active customers
+            models.Index(fields=['tenant', '-created_at'], name='cust_tenant_created_idx'),
+            models.Index(fields=['tenant', 'is_active', '-created_at'], name='cust_tenant_active_idx'),
         ]
         unique_together = [('tenant', 'email')]
 
@@ -0,0 +1,104 @@
+"""Queryset annotations shared by the customer views and serializers"""
+from django.db.models import Case, CharField, Exists, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from leads.models import Lead, LeadStatus, LeadCallSummary
+
+
+def annotate_customer_queryset(queryset, tenant):
+    """
+    Helper function to annotate customer queryset with is_lead_created and last_call_time.
+    This optimizes queries by using database annotations instead of N+1 queries.
+    """
+    # Annotate with is_lead_created: check if customer has any leads
+    has_lead = Lead.objects.filter(
+        tenant=tenant,
+        customer_id=OuterRef('pk')
+    )
+    queryset = queryset.annotate(
+        is_lead_created_annotation=Exists(has_lead)
+    )
+    
+    # Annotate with last_call_time: get the most recent call_time from call summaries
+    # Prefer call_time, fallback to created_at if call_time is null
+    # Get the latest call_time (preferred)
+    latest_call_time = Subquery(
+        LeadCallSummary.objects.filter(
+            tenant=tenant,
+            lead__customer_id=OuterRef('pk'),
+            is_active=True,
+            call_time__isnull=False
+        ).order_by('-call_time').values('call_time')[:1]
+    )
+    
+    # Get the latest created_at (fallback)
+    latest_created_at = Subquery(
+        LeadCallSummary.objects.filter(
+            tenant=tenant,
+            lead__customer_id=OuterRef('pk'),
+            is_active=True
+        ).order_by('-created_at').values('created_at')[:1]
+    )
+    
+    # Use Coalesce to prefer call_time, fallback to created_at
+    queryset = queryset.annotate(
+        last_call_time_annotation=Coalesce(latest_call_time, latest_created_at)
+    )
+    
+    return queryset
+
+
+def annotate_lead_status(queryset, tenant):
+    """
+    Helper function to annotate customer queryset with lead_status.
+    Priority: follow_up > interested > new > no_leads
+    """
+    # Build conditions for different lead statuses
+    has_any_lead = Lead.objects.filter(
+        tenant=tenant,
+        customer_id=OuterRef('pk')
+    )
+    
+    has_follow_up_lead = Lead.objects.filter(
+        tenant=tenant,
+        customer_id=OuterRef('pk'),
+        status=LeadStatus.FOLLOW_UP,
+        is_active=True
+    )
+    
+    has_interested_lead = Lead.objects.filter(
+        tenant=tenant,
+        customer_id=OuterRef('pk'),
+        status=LeadStatus.INTERESTED,
+        is_active=True
+    )
+    
+    has_new_lead = Lead.objects.filter(
+        tenant=tenant,
+        customer_id=OuterRef('pk'),
+        status=LeadStatus.NEW,
+        is_active=True
+    )
+    
+    # Annotate with lead status
+    # Priority: follow_up > interested > new > no_leads
+    queryset = queryset.annotate(
+        lead_status_annotation=Case(
+            When(Exists(has_follow_up_lead), then=Value('ATTEMPTED_TO_CONTACT')),
+            When(Exists(has_interested_lead), then=Value('INTERESTED')),
+            When(Exists(has_new_lead), then=Value('NEW')),
+            When(~Exists(has_any_lead), then=Value('NOT_CONTACTED')),
+            default=Value(None),
+            output_field=CharField()
+        )
+    )
+    
+    return queryset
+
+
+def annotate_customer_details(queryset, tenant):
+    """
+    Apply every annotation CustomerSerializer reads (is_lead_created, last_call_time, lead_status)
+    so it never falls back to per-customer queries.
+    """
+    return annotate_lead_status(annotate_customer_queryset(queryset, tenant), tenant)
@@ -1,92 +1,87 @@
+import operator
+from datetime import datetime
+from functools import lru_cache
+
+from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
+from crm_saas.serializers import CachedFieldsMixin
+from leads.models import Lead, LeadCallSummary
 from .models import Customer
+from .queries import annotate_customer_details, annotate_customer_queryset
 
 
-class CustomerSerializer(serializers.ModelSerializer):
-    is_lead_created = serializers.SerializerMethodField()
-    last_call_time = serializers.SerializerMethodField()
-    lead_status = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Customer
-        fields = [
-            'id', 'name', 'email', 'phone', 'company',
-            'address', 'city', 'state', 'country', 'zip_code', 'is_active',
-            'created_at', 'updated_at', 'is_lead_created', 'last_call_time', 'lead_status'
-        ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'is_lead_created', 'last_call_time', 'lead_status']
-        extra_kwargs = {
-            'email': {'required': True, 'allow_null': False, 'allow_blank': False},
-            'phone': {'required': True, 'allow_null': False, 'allow_blank': False},
-            # Align with model: company is optional and can be null/blank
-            'company': {'required': False, 'allow_null': True, 'allow_blank': True},
-            'is_active': {'required': True},
-        }
-    
+# Active lead status -> reported lead_status, highest priority first
+LEAD_STATUS_PRIORITY = (
+    ('follow_up', 'ATTEMPTED_TO_CONTACT'),
+    ('interested', 'INTERESTED'),
+    ('new', 'NEW'),
+)
+
+
+@lru_cache(maxsize=4096)
+def _to_iso(value):
+    """Reformat a datetime string as ISO 8601; list pages repeat the same timestamps, so memoize"""
+    try:
+        dt = parse_datetime(value)
+        if dt:
+            return dt.isoformat()
+    except (ValueError, TypeError):
+        pass
+    return value
+
+
+# Unbound field used by CustomerListSerializer to format timestamps exactly like the model serializer
+_datetime_field = serializers.DateTimeField()
+
+
+class LeadAnnotationMixin:
+    """
+    Lead-derived customer values shared by the customer serializers. Each method reads the
+    queryset annotation named in ANNOTATION_ATTRS and only queries when it is missing.
+    """
+    ANNOTATION_ATTRS = ('is_lead_created_annotation', 'last_call_time_annotation', 'lead_status_annotation')
+
     def get_is_lead_created(self, obj):
         """Check if any lead has been created for this customer"""
         # Check if annotation exists (from queryset)
         if hasattr(obj, 'is_lead_created_annotation'):
             return obj.is_lead_created_annotation
         # Fallback: check directly if not annotated
-        from leads.models import Lead
-        if hasattr(obj, 'tenant') and obj.tenant:
+        if obj.tenant_id:
             return Lead.objects.filter(
-                tenant=obj.tenant,
+                tenant_id=obj.tenant_id,
                 customer_id=obj.id
             ).exists()
         return False
     
     def get_last_call_time(self, obj):
         """Get the most recent call_time from call summaries for this customer's leads"""
-        from django.utils.dateparse import parse_datetime
-        from datetime import datetime
-        
         # Check if annotation exists (from queryset)
         last_call_time = None
         if hasattr(obj, 'last_call_time_annotation'):
             last_call_time = obj.last_call_time_annotation
         else:
             # Fallback: check directly if not annotated
-            from leads.models import Lead, LeadCallSummary
-            from django.db.models import Max
-            if hasattr(obj, 'tenant') and obj.tenant:
-                # Get all leads for this customer
-                customer_leads = Lead.objects.filter(
-                    tenant=obj.tenant,
-                    customer_id=obj.id
-                ).values_list('id', flat=True)
-                
-                if not customer_leads:
-                    return None
-                
-                # Get the most recent call_time from call summaries
-                # Use call_time if available, otherwise use created_at
-                latest_call = LeadCallSummary.objects.filter(
-                    tenant=obj.tenant,
-                    lead_id__in=customer_leads,
+            if obj.tenant_id:
+                summaries = LeadCallSummary.objects.filter(
+                    tenant_id=obj.tenant_id,
+                    lead__customer_id=obj.id,
                     is_active=True
-                ).aggregate(
-                    latest_call_time=Max('call_time'),
-                    latest_created_at=Max('created_at')
                 )
-                
-                # Return call_time if available, otherwise created_at
-                last_call_time = latest_call['latest_call_time'] or latest_call['latest_created_at']
+                # Latest call_time if any summary has one, otherwise latest created_at; each is an
+                # ORDER BY ... LIMIT 1 the (tenant, lead, is_active, call_time) index can serve
+                last_call_time = (
+                    summaries.filter(call_time__isnull=False).order_by('-call_time').values_list('call_time', flat=True).first()
+                    or summaries.order_by('-created_at').values_list('created_at', flat=True).first()
+                )
         
         # Convert datetime to ISO format string if it's a datetime object
         if last_call_time:
             if isinstance(last_call_time, datetime):
                 return last_call_time.isoformat()
             elif isinstance(last_call_time, str):
-                # If it's already a string, try to parse and reformat to ensure ISO format
-                try:
-                    dt = parse_datetime(last_call_time)
-                    if dt:
-                        return dt.isoformat()
-                except (ValueError, TypeError):
-                    pass
-                return last_call_time
+                # If it's already a string, parse and reformat to ensure ISO format
+                return _to_iso(last_call_time)
         return None
     
     def get_lead_status(self, obj):
@@ -95,169 +90,108 @@ class CustomerSerializer(serializers.ModelSerializer):
         if hasattr(obj, 'lead_status_annotation'):
             return obj.lead_status_annotation
         # Fallback: calculate directly if not annotated
-        from leads.models import Lead
-        if hasattr(obj, 'tenant') and obj.tenant:
-            # Check for leads with different statuses (priority: follow_up > interested > new > no_leads)
-            has_follow_up_lead = Lead.objects.filter(
-                tenant=obj.tenant,
-                customer_id=obj.id,
-                status='follow_up',
-                is_active=True
-            ).exists()
-            
-            if has_follow_up_lead:
-                return 'ATTEMPTED_TO_CONTACT'
-            
-            has_interested_lead = Lead.objects.filter(
-                tenant=obj.tenant,
-                customer_id=obj.id,
-                status='interested',
-                is_active=True
-            ).exists()
-            
-            if has_interested_lead:
-                return 'INTERESTED'
-            
-            has_new_lead = Lead.objects.filter(
-                tenant=obj.tenant,
-                customer_id=obj.id,
-                status='new',
-                is_active=True
-            ).exists()
-            
-            if has_new_lead:
-                return 'NEW'
-            
-            # Check if customer has any leads at all
-            has_any_lead = Lead.objects.filter(
-                tenant=obj.tenant,
-                customer_id=obj.id
-            ).exists()
-            
-            if not has_any_lead:
+        if obj.tenant_id:
+            leads = Lead.objects.filter(tenant_id=obj.tenant_id, customer_id=obj.id)
+            # One query for every active status, then pick by priority: follow_up > interested > new
+            statuses = set(leads.filter(is_active=True).values_list('status', flat=True).distinct())
+            for lead_status, label in LEAD_STATUS_PRIORITY:
+                if lead_status in statuses:
+                    return label
+            # Only customers with no leads at all (active or not) count as not contacted
+            if not statuses and not leads.exists():
                 return 'NOT_CONTACTED'
         
         return None
 
 
-class CustomerLeadStatusSerializer(serializers.Serializer):
-    """Custom serializer for customers with lead status in HubSpot-like format"""
-    id = serializers.SerializerMethodField()
-    properties = serializers.SerializerMethodField()
-    company = serializers.SerializerMethodField()
+class CustomerSerializer(LeadAnnotationMixin, CachedFieldsMixin, serializers.ModelSerializer):
     is_lead_created = serializers.SerializerMethodField()
     last_call_time = serializers.SerializerMethodField()
+    lead_status = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Customer
+        fields = [
+            'id', 'name', 'email', 'phone', 'company',
+            'address', 'city', 'state', 'country', 'zip_code', 'is_active',
+            'created_at', 'updated_at', 'is_lead_created', 'last_call_time', 'lead_status'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at', 'is_lead_created', 'last_call_time', 'lead_status']
+        extra_kwargs = {
+            'email': {'required': True, 'allow_null': False, 'allow_blank': False},
+            'phone': {'required': True, 'allow_null': False, 'allow_blank': False},
+            # Align with model: company is optional and can be null/blank
+            'company': {'required': False, 'allow_null': True, 'allow_blank': True},
+            'is_active': {'required': True},
+        }
+
+    @staticmethod
+    def setup_eager_loading(queryset, tenant):
+        """Annotate ``queryset`` with everything the method fields read so rows never fall back to per-customer queries"""
+        return annotate_customer_details(queryset, tenant)
 
-    def get_id(self, obj):
-        """Return customer ID as string"""
-        return str(obj.id)
 
-    def get_properties(self, obj):
-        """Return properties object with phone, firstname, lastname, email, and hs_lead_status"""
+class CustomerListSerializer(CustomerSerializer):
+    """
+    Read path of CustomerSerializer for list pages: emits the same payload with precomputed
+    attribute getters instead of iterating bound fields for every row.
+    """
+    PLAIN_FIELDS = (
+        'name', 'email', 'phone', 'company',
+        'address', 'city', 'state', 'country', 'zip_code', 'is_active',
+    )
+    _get_plain_fields = operator.attrgetter(*PLAIN_FIELDS)
+
+    def to_representation(self, obj):
+        data = {'id': str(obj.id)}
+        data.update(zip(self.PLAIN_FIELDS, self._get_plain_fields(obj)))
+        data['created_at'] = _datetime_field.to_representation(obj.created_at)
+        data['updated_at'] = _datetime_field.to_representation(obj.updated_at)
+        data['is_lead_created'] = self.get_is_lead_created(obj)
+        data['last_call_time'] = self.get_last_call_time(obj)
+        data['lead_status'] = self.get_lead_status(obj)
+        return data
+
+
+class CustomerLeadStatusSerializer(LeadAnnotationMixin, serializers.BaseSerializer):
+    """
+    Read-only serializer for customers with lead status in HubSpot-like format.
+    Builds the payload in one to_representation call instead of dispatching per-field methods.
+    """
+
+    @staticmethod
+    def setup_eager_loading(queryset, tenant):
+        """Annotate is_lead_created/last_call_time; the views set lead_status_annotation themselves"""
+        return annotate_customer_queryset(queryset, tenant)
+
+    def to_representation(self, obj):
         # Split name into firstname and lastname
         name_parts = (obj.name or '').strip().split(maxsplit=1)
-        firstname = name_parts[0] if name_parts else ''
-        lastname = name_parts[1] if len(name_parts) > 1 else ''
-
-        # Get lead status from annotation (set in view queryset)
-        hs_lead_status = None
-        if hasattr(obj, 'lead_status_annotation'):
-            hs_lead_status = obj.lead_status_annotation
 
-        # Use customer phone if available, otherwise use lead phone (from annotation)
-        customer_phone = obj.phone or ''
-        lead_phone = getattr(obj, 'lead_phone', None) or ''
-        phone = customer_phone if customer_phone else lead_phone
-        
-        # Remove '-' characters from phone number if present
-        phone = phone.replace('-', '')
+        # Use customer phone if available, otherwise use lead phone (from annotation);
+        # remove '-' characters from the phone number if present
+        phone = (obj.phone or getattr(obj, 'lead_phone', None) or '').replace('-', '')
 
         properties = {
             'phone': phone,
         }
 
         # Add optional fields only if they have values
-        if firstname:
-            properties['firstname'] = firstname
-        if lastname:
-            properties['lastname'] = lastname
+        if name_parts:
+            properties['firstname'] = name_parts[0]
+        if len(name_parts) > 1:
+            properties['lastname'] = name_parts[1]
         if obj.email:
             properties['email'] = obj.email
+        # Lead status comes from the annotation set in the view queryset
+        hs_lead_status = getattr(obj, 'lead_status_annotation', None)
         if hs_lead_status:
             properties['hs_lead_status'] = hs_lead_status
 
-        return properties
-
-    def get_company(self, obj):
-        """Return company object if company name exists"""
-        if obj.company:
-            return {
-                'name': obj.company
-            }
-        return None
-    
-    def get_is_lead_created(self, obj):
-        """Check if any lead has been created for this customer"""
-        # Check if annotation exists (from queryset)
-        if hasattr(obj, 'is_lead_created_annotation'):
-            return obj.is_lead_created_annotation
-        # Fallback: check directly if not annotated
-        from leads.models import Lead
-        if hasattr(obj, 'tenant') and obj.tenant:
-            return Lead.objects.filter(
-                tenant=obj.tenant,
-                customer_id=obj.id
-            ).exists()
-        return False
-    
-    def get_last_call_time(self, obj):
-        """Get the most recent call_time from call summaries for this customer's leads"""
-        from django.utils.dateparse import parse_datetime
-        from datetime import datetime
-        
-        # Check if annotation exists (from queryset)
-        last_call_time = None
-        if hasattr(obj, 'last_call_time_annotation'):
-            last_call_time = obj.last_call_time_annotation
-        else:
-            # Fallback: check directly if not annotated
-            from leads.models import Lead, LeadCallSummary
-            from django.db.models import Max
-            if hasattr(obj, 'tenant') and obj.tenant:
-                # Get all leads for this customer
-                customer_leads = Lead.objects.filter(
-                    tenant=obj.tenant,
-                    customer_id=obj.id
-                ).values_list('id', flat=True)
-                
-                if not customer_leads:
-                    return None
-                
-                # Get the most recent call_time from call summaries
-                # Use call_time if available, otherwise use created_at
-                latest_call = LeadCallSummary.objects.filter(
-                    tenant=obj.tenant,
-                    lead_id__in=customer_leads,
-                    is_active=True
-                ).aggregate(
-                    latest_call_time=Max('call_time'),
-                    latest_created_at=Max('created_at')
-                )
-                
-                # Return call_time if available, otherwise created_at
-                last_call_time = latest_call['latest_call_time'] or latest_call['latest_created_at']
-        
-        # Convert datetime to ISO format string if it's a datetime object
-        if last_call_time:
-            if isinstance(last_call_time, datetime):
-                return last_call_time.isoformat()
-            elif isinstance(last_call_time, str):
-                # If it's already a string, try to parse and reformat to ensure ISO format
-                try:
-                    dt = parse_datetime(last_call_time)
-                    if dt:
-                        return dt.isoformat()
-                except (ValueError, TypeError):
-                    pass
-                return last_call_time
-        return None
+        return {
+            'id': str(obj.id),
+            'properties': properties,
+            'company': {'name': obj.company} if obj.company else None,
+            'is_lead_created': self.get_is_lead_created(obj),
+            'last_call_time': self.get_last_call_time(obj),
+        }
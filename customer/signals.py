@@ -1,60 +1,109 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 from .models import Customer, CustomerHistory
 import json
 
 
-def get_field_value(obj, field_name):
-    """Safely get field value, handling ForeignKeys and special fields"""
-    try:
-        field = obj._meta.get_field(field_name)
-        if field.many_to_one:  # ForeignKey
-            value = getattr(obj, field_name)
-            return str(value.id) if value else None
-        elif field.many_to_many:
-            return [str(item.id) for item in getattr(obj, field_name).all()]
-        else:
-            value = getattr(obj, field_name)
-            # Convert to string for storage, handling None
-            if value is None:
-                return None
-            if isinstance(value, (dict, list)):
-                return json.dumps(value)
-            return str(value)
-    except Exception:
+TRACKED_FIELDS = ('name', 'email', 'phone', 'company', 'address', 'city', 'state', 'country', 'zip_code', 'is_active')
+
+
+def stringify(value):
+    """Convert a raw field value to the string form stored in history"""
+    if value is None:
         return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
 
 
-@receiver(pre_save, sender=Customer)
-def customer_pre_save(sender, instance, **kwargs):
-    """Store the old instance before save to compare changes"""
-    if instance.pk:
-        try:
-            old_instance = Customer.objects.get(pk=instance.pk)
-            instance._old_instance = old_instance
-        except Customer.DoesNotExist:
-            instance._old_instance = None
-    else:
-        instance._old_instance = None
+def take_snapshot(instance, fields=None):
+    """Copy the loaded values of tracked fields (deferred fields are skipped)"""
+    names = TRACKED_FIELDS if fields is None else [name for name in TRACKED_FIELDS if name in fields]
+    return {name: instance.__dict__[name] for name in names if name in instance.__dict__}
+
+
+def diff_snapshots(old_snapshot, new_snapshot):
+    """Return {field: {'old': ..., 'new': ...}} in history form for the tracked fields that differ"""
+    changes = {}
+    for field_name, raw_old in old_snapshot.items():
+        if field_name not in new_snapshot:
+            continue
+        raw_new = new_snapshot[field_name]
+        if raw_old == raw_new:
+            continue
+        old_value, new_value = stringify(raw_old), stringify(raw_new)
+        if old_value != new_value:
+            changes[field_name] = {'old': old_value, 'new': new_value}
+    return changes
+
+
+def history_for_changes(instance, changes, changed_by):
+    """Build (unsaved) CustomerHistory rows describing ``changes`` made to ``instance``"""
+    history = []
+    changes = dict(changes)
+    # Check if this is a soft delete (is_active changed to False)
+    if 'is_active' in changes and changes['is_active']['new'] == 'False':
+        history.append(CustomerHistory(
+            customer=instance,
+            tenant=instance.tenant,
+            changed_by=changed_by,
+            action='deleted',
+            field_name='is_active',
+            old_value=changes['is_active']['old'],
+            new_value=changes['is_active']['new'],
+            changes=dict(changes),
+            notes='Customer was soft-deleted'
+        ))
+        changes.pop('is_active', None)
+
+    # Record other changes if any
+    if changes:
+        changed_fields = list(changes.keys())
+        history.append(CustomerHistory(
+            customer=instance,
+            tenant=instance.tenant,
+            changed_by=changed_by,
+            action='updated',
+            field_name=', '.join(changed_fields) if len(changed_fields) <= 3 else f"{len(changed_fields)} fields",
+            changes=changes,
+            notes=f"Updated fields: {', '.join(changed_fields)}"
+        ))
+    return history
+
+
+@receiver(post_init, sender=Customer)
+def customer_post_init(sender, instance, **kwargs):
+    """Snapshot tracked fields on load so updates can be diffed without re-fetching the row"""
+    instance._snapshot = take_snapshot(instance)
 
 
 @receiver(post_save, sender=Customer)
-def customer_post_save(sender, instance, created, **kwargs):
+def customer_post_save(sender, instance, created, update_fields=None, **kwargs):
     """Track changes to Customer model"""
+    old_snapshot = getattr(instance, '_snapshot', None)
+    if update_fields and old_snapshot is not None:
+        # Only the listed columns were written, so only those can have changed
+        written = take_snapshot(instance, update_fields)
+        instance._snapshot = {**old_snapshot, **written}
+        old_snapshot = {name: old_snapshot[name] for name in written if name in old_snapshot}
+        if not old_snapshot:
+            # None of the written columns are tracked
+            return
+    else:
+        instance._snapshot = take_snapshot(instance)
+        if not created and old_snapshot == instance._snapshot:
+            # No-op save: nothing tracked changed, so skip the per-field diff
+            return
+    
     # Get the user from the request if available
     changed_by = None
     if hasattr(instance, '_changed_by'):
         changed_by = instance._changed_by
-    elif hasattr(instance, 'created_by') and created:
+    elif created and hasattr(instance, 'created_by'):
         changed_by = instance.created_by
     
     tenant = instance.tenant
     
-    # Ensure we're in the tenant database context
-    from django.db import connections
-    if hasattr(connections['default'], 'tenant'):
-        connections['default'].tenant = tenant
-    
     if created:
         # Record creation
         CustomerHistory.objects.create(
@@ -67,47 +116,8 @@ def customer_post_save(sender, instance, created, **kwargs):
         )
     else:
         # Record updates
-        old_instance = getattr(instance, '_old_instance', None)
-        if old_instance:
-            changes = {}
-            tracked_fields = ['name', 'email', 'phone', 'company', 'address', 'city', 'state', 'country', 'zip_code', 'is_active']
-            
-            for field_name in tracked_fields:
-                old_value = get_field_value(old_instance, field_name)
-                new_value = get_field_value(instance, field_name)
-                
-                if old_value != new_value:
-                    changes[field_name] = {
-                        'old': old_value,
-                        'new': new_value
-                    }
-            
-            if changes:
-                # Check if this is a soft delete (is_active changed to False)
-                if 'is_active' in changes and changes['is_active']['new'] == 'False':
-                    CustomerHistory.objects.create(
-                        customer=instance,
-                        tenant=tenant,
-                        changed_by=changed_by,
-                        action='deleted',
-                        field_name='is_active',
-                        old_value=changes['is_active']['old'],
-                        new_value=changes['is_active']['new'],
-                        changes=changes,
-                        notes='Customer was soft-deleted'
-                    )
-                    changes.pop('is_active', None)
-                
-                # Record other changes if any
-                if changes:
-                    changed_fields = list(changes.keys())
-                    CustomerHistory.objects.create(
-                        customer=instance,
-                        tenant=tenant,
-                        changed_by=changed_by,
-                        action='updated',
-                        field_name=', '.join(changed_fields) if len(changed_fields) <= 3 else f"{len(changed_fields)} fields",
-                        changes=changes,
-                        notes=f"Updated fields: {', '.join(changed_fields)}"
-                    )
-
+        if old_snapshot:
+            changes = diff_snapshots(old_snapshot, instance._snapshot)
+            history_records = history_for_changes(instance, changes, changed_by)
+            if history_records:
+                CustomerHistory.objects.bulk_create(history_records)
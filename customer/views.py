@@ -1,119 +1,40 @@
-from rest_framework import status, generics, filters
+from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from django.utils import timezone
 from django.utils.decorators import method_decorator
-from django.db import models
+from django.db import models, router, transaction
 from django.conf import settings
+from django.http import Http404
 import requests
 import logging
 from .models import Customer, CustomerHistory
-from user.models import CustomUser
-from .serializers import CustomerSerializer, CustomerLeadStatusSerializer
+from .signals import history_for_changes
+from crm_saas.filters import CachedSearchFilter, ScopedSearchFilter
+from user.mixins import TenantContextMixin
+from .serializers import CustomerSerializer, CustomerListSerializer, CustomerLeadStatusSerializer
 from .history_serializers import CustomerHistorySerializer
 from .importer import detect_and_parse_tabular, normalize_customer_row
-from leads.models import Lead, LeadStatus, LeadCallSummary
+from leads.models import Lead, LeadStatus
 
 logger = logging.getLogger(__name__)
 
+# Shared by every request so calls to the campaign API reuse pooled keep-alive connections
+# instead of opening (and TLS-negotiating) a new one each time
+campaign_api_session = requests.Session()
 
-def annotate_customer_queryset(queryset, tenant):
-    """
-    Helper function to annotate customer queryset with is_lead_created and last_call_time.
-    This optimizes queries by using database annotations instead of N+1 queries.
-    """
-    from django.db.models import Exists, OuterRef, Subquery
-    from django.db.models.functions import Coalesce
-    
-    # Annotate with is_lead_created: check if customer has any leads
-    has_lead = Lead.objects.filter(
-        tenant=tenant,
-        customer_id=OuterRef('pk')
-    )
-    queryset = queryset.annotate(
-        is_lead_created_annotation=Exists(has_lead)
-    )
-    
-    # Annotate with last_call_time: get the most recent call_time from call summaries
-    # Prefer call_time, fallback to created_at if call_time is null
-    # Get the latest call_time (preferred)
-    latest_call_time = Subquery(
-        LeadCallSummary.objects.filter(
-            tenant=tenant,
-            lead__customer_id=OuterRef('pk'),
-            is_active=True,
-            call_time__isnull=False
-        ).order_by('-call_time').values('call_time')[:1]
-    )
-    
-    # Get the latest created_at (fallback)
-    latest_created_at = Subquery(
-        LeadCallSummary.objects.filter(
-            tenant=tenant,
-            lead__customer_id=OuterRef('pk'),
-            is_active=True
-        ).order_by('-created_at').values('created_at')[:1]
-    )
-    
-    # Use Coalesce to prefer call_time, fallback to created_at
-    queryset = queryset.annotate(
-        last_call_time_annotation=Coalesce(latest_call_time, latest_created_at)
-    )
-    
-    return queryset
-
-
-def annotate_lead_status(queryset, tenant):
-    """
-    Helper function to annotate customer queryset with lead_status.
-    Priority: follow_up > interested > new > no_leads
-    """
-    from django.db.models import Exists, OuterRef, Case, When, Value, CharField
-    
-    # Build conditions for different lead statuses
-    has_any_lead = Lead.objects.filter(
-        tenant=tenant,
-        customer_id=OuterRef('pk')
-    )
-    
-    has_follow_up_lead = Lead.objects.filter(
-        tenant=tenant,
-        customer_id=OuterRef('pk'),
-        status=LeadStatus.FOLLOW_UP,
-        is_active=True
-    )
-    
-    has_interested_lead = Lead.objects.filter(
-        tenant=tenant,
-        customer_id=OuterRef('pk'),
-        status=LeadStatus.INTERESTED,
-        is_active=True
-    )
-    
-    has_new_lead = Lead.objects.filter(
-        tenant=tenant,
-        customer_id=OuterRef('pk'),
-        status=LeadStatus.NEW,
-        is_active=True
-    )
-    
-    # Annotate with lead status
-    # Priority: follow_up > interested > new > no_leads
-    queryset = queryset.annotate(
-        lead_status_annotation=Case(
-            When(Exists(has_follow_up_lead), then=Value('ATTEMPTED_TO_CONTACT')),
-            When(Exists(has_interested_lead), then=Value('INTERESTED')),
-            When(Exists(has_new_lead), then=Value('NEW')),
-            When(~Exists(has_any_lead), then=Value('NOT_CONTACTED')),
-            default=Value(None),
-            output_field=CharField()
-        )
-    )
-    
-    return queryset
+# Columns CustomerSerializer renders, plus tenant_id for its fallbacks; created_by is never serialized
+CUSTOMER_PAYLOAD_COLUMNS = (
+    'id', 'tenant_id', 'name', 'email', 'phone', 'company', 'address', 'city',
+    'state', 'country', 'zip_code', 'is_active', 'created_at', 'updated_at',
+)
+
+# Customer columns copied as-is from a normalized import row (missing values become NULL)
+IMPORT_OPTIONAL_FIELDS = ('phone', 'company', 'address', 'city', 'state', 'country', 'zip_code')
 
 
 @method_decorator(
@@ -165,67 +86,48 @@ def annotate_lead_status(queryset, tenant):
         },
     ),
 )
-class CustomerListCreateView(generics.ListCreateAPIView):
+class CustomerListCreateView(TenantContextMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CustomerSerializer
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [ScopedSearchFilter]
     search_fields = ['name', 'email', 'phone', 'company', 'city', 'state', 'country']
+    # Columns a client may target with ?search_field= for an indexed prefix match
+    scoped_search_fields = ('email', 'name', 'company', 'phone')
+
+    def get_serializer_class(self):
+        # Listing only reads, so use the getter-based serializer for the page rows
+        if self.request.method == 'GET':
+            return CustomerListSerializer
+        return CustomerSerializer
 
     def get_queryset(self):
         # Scope to current tenant
-        if hasattr(self.request.user, 'tenant') and self.request.user.tenant:
-            from django.db import connections
-            connections['default'].tenant = self.request.user.tenant
-            # Default ordering: newest first
-            queryset = Customer.objects.filter(tenant=self.request.user.tenant).order_by('-created_at')
-            # Annotate with is_lead_created and last_call_time
-            queryset = annotate_customer_queryset(queryset, self.request.user.tenant)
-            # Annotate with lead_status
-            queryset = annotate_lead_status(queryset, self.request.user.tenant)
-            return queryset
+        tenant = self.request.tenant
+        if tenant:
+            # Default ordering: newest first; load only the columns the payload renders
+            queryset = Customer.objects.filter(tenant=tenant).only(
+                *CUSTOMER_PAYLOAD_COLUMNS
+            ).order_by('-created_at')
+            return self.get_serializer_class().setup_eager_loading(queryset, tenant)
         return Customer.objects.none()
 
     def create(self, request, *args, **kwargs):
         if not request.user or not request.user.is_authenticated:
             return Response({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        if not request.user.tenant:
+        if not request.tenant:
             return Response({'detail': 'No tenant associated'}, status=status.HTTP_400_BAD_REQUEST)
-        from django.db import connections
-        connections['default'].tenant = request.user.tenant
-        # Ensure the acting user exists in the tenant database so FK constraints pass
-        # Some flows authenticate against the main DB; we mirror the user into the
-        # tenant DB on-demand using the same primary key.
-        try:
-            # Check presence in the tenant DB context
-            CustomUser.objects.get(id=request.user.id)
-        except CustomUser.DoesNotExist:
-            # Create a lightweight clone in the tenant DB with the same ID
-            # Password hash and flags are copied to preserve auth semantics if used.
-            CustomUser.objects.create(
-                id=request.user.id,
-                username=request.user.username,
-                email=request.user.email,
-                first_name=request.user.first_name,
-                last_name=request.user.last_name,
-                is_active=request.user.is_active,
-                is_staff=request.user.is_staff,
-                is_superuser=request.user.is_superuser,
-                password=request.user.password,
-                # IMPORTANT: Do not set tenant FK inside tenant DB to avoid
-                # cross-database FK constraint issues. Leave it NULL here.
-                tenant=None,
-            )
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        customer = Customer(
-            tenant=request.user.tenant,
-            created_by=request.user,
-            **serializer.validated_data,
-        )
-        # Attach user for history tracking
-        customer._changed_by = request.user
-        customer.save()
-        return Response(CustomerSerializer(customer).data, status=status.HTTP_201_CREATED)
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        # Ensure the acting user exists in the tenant database so FK constraints pass;
+        # the history signal records created_by as the author of a new customer
+        tenant_user = self.get_tenant_user()
+        customer = serializer.save(tenant=self.request.tenant, created_by=tenant_user)
+        # A customer that was just created has no leads or calls yet, so fill in the values the
+        # method fields would otherwise query for
+        customer.is_lead_created_annotation = False
+        customer.last_call_time_annotation = None
+        customer.lead_status_annotation = 'NOT_CONTACTED'
 
 
 @method_decorator(
@@ -282,43 +184,40 @@ class CustomerListCreateView(generics.ListCreateAPIView):
         },
     ),
 )
-class CustomerDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CustomerDetailView(TenantContextMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CustomerSerializer
     lookup_field = 'pk'
     http_method_names = ['get', 'patch', 'delete']  # Exclude PUT
 
     def get_queryset(self):
-        if hasattr(self.request.user, 'tenant') and self.request.user.tenant:
-            from django.db import connections
-            connections['default'].tenant = self.request.user.tenant
-            queryset = Customer.objects.filter(tenant=self.request.user.tenant)
-            # Annotate with is_lead_created and last_call_time
-            queryset = annotate_customer_queryset(queryset, self.request.user.tenant)
-            # Annotate with lead_status
-            queryset = annotate_lead_status(queryset, self.request.user.tenant)
-            return queryset
+        tenant = self.request.tenant
+        if tenant:
+            queryset = Customer.objects.filter(tenant=tenant).only(*CUSTOMER_PAYLOAD_COLUMNS)
+            return self.get_serializer_class().setup_eager_loading(queryset, tenant)
         return Customer.objects.none()
 
     def perform_update(self, serializer):
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=self.request.user.id).first()
         instance = serializer.instance
-        instance._changed_by = tenant_user if tenant_user else self.request.user
+        instance._changed_by = self.get_tenant_user()
         serializer.save()
 
     def delete(self, request, *args, **kwargs):
-        instance = self.get_object()
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
-        # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
-        instance.is_active = False
-        instance._changed_by = tenant_user if tenant_user else request.user
-        instance.save(update_fields=['is_active', 'updated_at'])
-        # History will be tracked by the signal
+        tenant = request.tenant
+        customers = Customer.objects.filter(pk=kwargs[self.lookup_field], tenant=tenant)
+        with transaction.atomic(using=router.db_for_write(Customer)):
+            # One UPDATE instead of loading the annotated row and saving it back
+            deactivated = customers.filter(is_active=True).update(is_active=False, updated_at=timezone.now())
+            if deactivated:
+                # Queryset updates send no signals, so record the soft delete here
+                CustomerHistory.objects.bulk_create(history_for_changes(
+                    Customer(pk=kwargs[self.lookup_field], tenant=tenant),
+                    {'is_active': {'old': 'True', 'new': 'False'}},
+                    self.get_tenant_user(),
+                ))
+            elif not customers.exists():
+                raise Http404("No %s matches the given query." % Customer._meta.object_name)
         return Response({'message': 'Customer soft-deleted'}, status=status.HTTP_200_OK)
 
 
@@ -350,98 +249,107 @@ class CustomerDetailView(generics.RetrieveUpdateDestroyAPIView):
         },
     ),
 )
-class CustomerImportView(APIView):
+class CustomerImportView(TenantContextMixin, APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    batch_size = 1000
 
     def post(self, request, *args, **kwargs):
         if not request.user or not request.user.is_authenticated:
             return Response({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        if not getattr(request.user, 'tenant', None):
+        tenant = request.tenant
+        if not tenant:
             return Response({'detail': 'No tenant associated'}, status=status.HTTP_400_BAD_REQUEST)
 
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'detail': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        from django.db import connections
-        connections['default'].tenant = request.user.tenant
-
         # Ensure user exists inside tenant DB context
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
-        if not tenant_user:
-            tenant_user = CustomUser.objects.create(
-                id=request.user.id,
-                username=request.user.username,
-                email=request.user.email,
-                first_name=request.user.first_name,
-                last_name=request.user.last_name,
-                is_active=request.user.is_active,
-                is_staff=request.user.is_staff,
-                is_superuser=request.user.is_superuser,
-                password=request.user.password,
-                # IMPORTANT: Prevent FK error by keeping tenant NULL inside tenant DB
-                tenant=None,
-            )
+        tenant_user = self.get_tenant_user()
 
         try:
             rows, _fmt = detect_and_parse_tabular(file_obj, file_obj.name)
         except Exception as exc:
             return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        processed = created = updated = skipped = 0
+        processed = created = updated = 0
+        # Every skipped row gets exactly one entry here
         errors = []
-        for idx, raw in enumerate(rows, start=2):  # assuming row 1 is header
-            processed += 1
-            data = normalize_customer_row(raw)
-            email = (data.get('email') or '') if data else ''
-            name = (data.get('name') or '') if data else ''
-            if not email:
-                skipped += 1
-                errors.append({'row': idx, 'error': 'Email is required'})
-                continue
-            try:
-                if not name:
-                    name = email.split('@')[0]
-                defaults = {
-                    'name': name,
-                    'phone': data.get('phone'),
-                    'company': data.get('company'),
-                    'address': data.get('address'),
-                    'city': data.get('city'),
-                    'state': data.get('state'),
-                    'country': data.get('country'),
-                    'zip_code': data.get('zip_code'),
-                    'is_active': data.get('is_active', True),
-                    'created_by': tenant_user,
-                }
-                obj, created_flag = Customer.objects.update_or_create(
-                    tenant=request.user.tenant,
-                    email=email,
-                    defaults=defaults,
-                )
-                # Attach user for history tracking
-                obj._changed_by = tenant_user
-                if created_flag:
-                    created += 1
-                else:
-                    updated += 1
-                obj.save()
-            except Exception as exc:
-                skipped += 1
-                errors.append({'row': idx, 'error': str(exc)})
+        batch = {}
+        try:
+            # One transaction for the whole file: each batch runs in a savepoint, so a failed batch
+            # only rolls back itself, and a malformed file leaves nothing half-imported
+            with transaction.atomic(using=router.db_for_write(Customer)):
+                for idx, raw in enumerate(rows, start=2):  # assuming row 1 is header
+                    processed += 1
+                    data = normalize_customer_row(raw)
+                    email = (data.get('email') or '') if data else ''
+                    name = (data.get('name') or '') if data else ''
+                    if not email:
+                        errors.append({'row': idx, 'error': 'Email is required'})
+                        continue
+                    # Spreadsheet cells can be numbers; the model and the upsert expect text
+                    email = str(email)
+                    if not name:
+                        name = email.split('@')[0]
+                    key = email.lower()
+                    # A repeated email must see the earlier row's write, as it would with per-row saves
+                    if key in batch or len(batch) >= self.batch_size:
+                        batch_created, batch_updated = self.write_batch(batch, tenant_user, errors)
+                        created += batch_created
+                        updated += batch_updated
+                    batch[key] = (idx, Customer(
+                        tenant=tenant,
+                        email=email,
+                        name=name,
+                        is_active=data.get('is_active', True),
+                        created_by=tenant_user,
+                        **{field: data.get(field) for field in IMPORT_OPTIONAL_FIELDS},
+                    ))
+                batch_created, batch_updated = self.write_batch(batch, tenant_user, errors)
+                created += batch_created
+                updated += batch_updated
+        except Exception as exc:
+            # Rows are parsed lazily, so a malformed file can only be detected part-way through;
+            # the transaction above has already rolled back anything written before that point
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             {
                 'processed': processed,
                 'created': created,
                 'updated': updated,
-                'skipped': skipped,
+                'skipped': len(errors),
                 'errors': errors,
             },
             status=status.HTTP_200_OK,
         )
 
+    def write_batch(self, batch, tenant_user, errors):
+        """Upsert the buffered rows in bulk and clear ``batch``; failed rows are appended to ``errors``"""
+        entries = list(batch.values())
+        batch.clear()
+        if not entries:
+            return 0, 0
+        try:
+            return Customer.objects.upsert_with_history(
+                [customer for _idx, customer in entries], tenant_user, batch_size=self.batch_size
+            )
+        except Exception:
+            # Retry one row at a time so only the offending rows are reported
+            pass
+        created = updated = 0
+        for idx, customer in entries:
+            try:
+                row_created, row_updated = Customer.objects.upsert_with_history([customer], tenant_user)
+            except Exception as exc:
+                errors.append({'row': idx, 'error': str(exc)})
+            else:
+                created += row_created
+                updated += row_updated
+        return created, updated
+
 
 @method_decorator(
     name='get',
@@ -492,31 +400,27 @@ class CustomerImportView(APIView):
         },
     ),
 )
-class CustomerHistoryView(generics.ListAPIView):
+class CustomerHistoryView(TenantContextMixin, generics.ListAPIView):
     """API endpoint to retrieve history of changes for a specific customer"""
     permission_classes = [IsAuthenticated]
     serializer_class = CustomerHistorySerializer
     lookup_field = 'pk'
 
     def get_queryset(self):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
-            return CustomerHistory.objects.none()
-        
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
-        
-        customer_id = self.kwargs.get('pk')
-        
-        # Verify customer exists and belongs to tenant
-        try:
-            customer = Customer.objects.get(id=customer_id, tenant=self.request.user.tenant)
-        except Customer.DoesNotExist:
+        tenant = self.request.tenant
+        if not tenant:
             return CustomerHistory.objects.none()
         
+        # Rows are tenant-scoped, so an unknown or foreign customer simply yields no history;
+        # no separate lookup of the customer is needed. Pull just the two author columns rather
+        # than hydrating a CustomUser per row
         return CustomerHistory.objects.filter(
-            customer=customer,
-            tenant=self.request.user.tenant
-        ).select_related('changed_by').order_by('-created_at')
+            customer_id=self.kwargs.get('pk'),
+            tenant=tenant
+        ).annotate(
+            changed_by_username=models.F('changed_by__username'),
+            changed_by_email=models.F('changed_by__email'),
+        ).order_by('-created_at')
 
 
 @method_decorator(
@@ -558,75 +462,50 @@ class CustomerHistoryView(generics.ListAPIView):
         },
     ),
 )
-class CustomersByLeadStatusView(generics.ListAPIView):
+class CustomersByLeadStatusView(TenantContextMixin, generics.ListAPIView):
     """API endpoint to retrieve customers that have no leads, follow-up leads, new status leads, or interested status leads"""
     permission_classes = [IsAuthenticated]
     serializer_class = CustomerLeadStatusSerializer
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [CachedSearchFilter]
     search_fields = ['name', 'email', 'phone', 'company', 'city', 'state', 'country']
     pagination_class = None  # Disable pagination
 
     def get_queryset(self):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             return Customer.objects.none()
         
-        from django.db import connections
-        from django.db.models import Q, Exists, OuterRef, Case, When, Value, CharField, Subquery
-        connections['default'].tenant = self.request.user.tenant
+        from django.db.models import Q, Count, OuterRef, Case, When, Value, CharField, Subquery
         
-        # Base queryset for active customers
+        # Count each customer's leads per condition in one pass over a single join, instead of
+        # running a correlated EXISTS per condition for every customer row
+        tenant_leads = Q(leads__tenant=tenant)
+        active_leads = tenant_leads & Q(leads__is_active=True)
         base_queryset = Customer.objects.filter(
-            tenant=self.request.user.tenant,
-            is_active=True
-        )
-        
-        # Build conditions using subqueries for better performance
-        # 1. Customers with no leads at all
-        has_any_lead = Lead.objects.filter(
-            tenant=self.request.user.tenant,
-            customer_id=OuterRef('pk')
-        )
-        
-        # 2. Customers with follow-up leads
-        has_follow_up_lead = Lead.objects.filter(
-            tenant=self.request.user.tenant,
-            customer_id=OuterRef('pk'),
-            status=LeadStatus.FOLLOW_UP,
-            is_active=True
-        )
-        
-        # 3. Customers with new status leads
-        has_new_lead = Lead.objects.filter(
-            tenant=self.request.user.tenant,
-            customer_id=OuterRef('pk'),
-            status=LeadStatus.NEW,
-            is_active=True
-        )
-        
-        # 4. Customers with interested status leads
-        has_interested_lead = Lead.objects.filter(
-            tenant=self.request.user.tenant,
-            customer_id=OuterRef('pk'),
-            status=LeadStatus.INTERESTED,
+            tenant=tenant,
             is_active=True
-        )
-        
-        # Check if customer has phone or has a lead with phone
-        has_customer_phone = Q(phone__isnull=False) & ~Q(phone='')
-        has_lead_with_phone = Exists(
-            Lead.objects.filter(
-                tenant=self.request.user.tenant,
-                customer_id=OuterRef('pk'),
-                phone__isnull=False
-            ).exclude(phone='')
+        ).only('id', 'tenant_id', 'name', 'email', 'phone', 'company', 'created_at').annotate(
+            # 1. Customers with no leads at all
+            any_lead_count=Count('leads', filter=tenant_leads),
+            # 2. Customers with follow-up leads
+            follow_up_lead_count=Count('leads', filter=active_leads & Q(leads__status=LeadStatus.FOLLOW_UP)),
+            # 3. Customers with new status leads
+            new_lead_count=Count('leads', filter=active_leads & Q(leads__status=LeadStatus.NEW)),
+            # 4. Customers with interested status leads
+            interested_lead_count=Count('leads', filter=active_leads & Q(leads__status=LeadStatus.INTERESTED)),
+            # Leads that can supply a phone number
+            lead_phone_count=Count(
+                'leads', filter=tenant_leads & Q(leads__phone__isnull=False) & ~Q(leads__phone='')
+            ),
         )
         
         # Filter: customer must have phone OR have a lead with phone
-        base_queryset = base_queryset.filter(has_customer_phone | has_lead_with_phone)
+        has_customer_phone = Q(phone__isnull=False) & ~Q(phone='')
+        base_queryset = base_queryset.filter(has_customer_phone | Q(lead_phone_count__gt=0))
         
         # Annotate with lead phone for serializer (use lead phone if customer phone is missing)
         lead_phone_subquery = Lead.objects.filter(
-            tenant=self.request.user.tenant,
+            tenant=tenant,
             customer_id=OuterRef('pk'),
             phone__isnull=False
         ).exclude(phone='').order_by('-created_at').values('phone')[:1]
@@ -639,10 +518,10 @@ class CustomersByLeadStatusView(generics.ListAPIView):
         # Priority: follow_up > interested > new > no_leads
         base_queryset = base_queryset.annotate(
             lead_status_annotation=Case(
-                When(Exists(has_follow_up_lead), then=Value('ATTEMPTED_TO_CONTACT')),
-                When(Exists(has_interested_lead), then=Value('INTERESTED')),
-                When(Exists(has_new_lead), then=Value('NEW')),
-                When(~Exists(has_any_lead), then=Value('NOT_CONTACTED')),
+                When(follow_up_lead_count__gt=0, then=Value('ATTEMPTED_TO_CONTACT')),
+                When(interested_lead_count__gt=0, then=Value('INTERESTED')),
+                When(new_lead_count__gt=0, then=Value('NEW')),
+                When(any_lead_count=0, then=Value('NOT_CONTACTED')),
                 default=Value(None),
                 output_field=CharField()
             )
@@ -650,11 +529,12 @@ class CustomersByLeadStatusView(generics.ListAPIView):
         
         # Combine conditions: (no leads) OR (follow-up leads) OR (new status leads) OR (interested status leads)
         base_queryset = base_queryset.filter(
-            ~Exists(has_any_lead) | Exists(has_follow_up_lead) | Exists(has_new_lead) | Exists(has_interested_lead)
-        ).distinct().order_by('-created_at')
+            Q(any_lead_count=0) | Q(follow_up_lead_count__gt=0) | Q(new_lead_count__gt=0)
+            | Q(interested_lead_count__gt=0)
+        ).order_by('-created_at')  # grouped per customer, so no DISTINCT is needed
         
         # Annotate with is_lead_created and last_call_time
-        base_queryset = annotate_customer_queryset(base_queryset, self.request.user.tenant)
+        base_queryset = self.get_serializer_class().setup_eager_loading(base_queryset, tenant)
         
         return base_queryset
 
@@ -666,7 +546,7 @@ class CustomersByLeadStatusView(generics.ListAPIView):
         3. Call external POST API with the serialized data and token
         4. Return the external API response
         """
-        # Get queryset and limit to 10 customers
+        # Get queryset and limit to 10 customers; the slice is applied as a LIMIT in SQL
         queryset = self.filter_queryset(self.get_queryset())[:10]
         
         # Serialize the data
@@ -696,7 +576,7 @@ class CustomersByLeadStatusView(generics.ListAPIView):
                 'Content-Type': 'application/json',
                 'ngrok-skip-browser-warning': 'true'  # Bypass ngrok warning page
             }
-            response = requests.post(
+            response = campaign_api_session.post(
                 external_api_url,
                 json=payload,
                 headers=headers,
@@ -756,7 +636,7 @@ class CustomersByLeadStatusView(generics.ListAPIView):
         },
     ),
 )
-class CustomerByIdByLeadStatusView(APIView):
+class CustomerByIdByLeadStatusView(TenantContextMixin, APIView):
     """API endpoint to retrieve a specific customer by ID that matches lead status conditions"""
     permission_classes = [IsAuthenticated]
     serializer_class = CustomerLeadStatusSerializer
@@ -765,18 +645,17 @@ class CustomerByIdByLeadStatusView(APIView):
         """
         Get a specific customer by ID, serialize it, call external POST API, and return the response.
         """
-        if not hasattr(request.user, 'tenant') or not request.user.tenant:
+        tenant = request.tenant
+        if not tenant:
             return Response({'detail': 'No tenant associated'}, status=status.HTTP_400_BAD_REQUEST)
         
-        from django.db import connections
         from django.db.models import Subquery
-        connections['default'].tenant = request.user.tenant
         
         try:
             # Get the customer
             customer = Customer.objects.get(
                 id=pk,
-                tenant=request.user.tenant,
+                tenant=tenant,
                 is_active=True
             )
         except Customer.DoesNotExist:
@@ -785,7 +664,7 @@ class CustomerByIdByLeadStatusView(APIView):
         # Check if customer has phone or has a lead with phone
         has_customer_phone = customer.phone and customer.phone.strip()
         has_lead_with_phone = Lead.objects.filter(
-            tenant=request.user.tenant,
+            tenant=tenant,
             customer_id=customer.id,
             phone__isnull=False
         ).exclude(phone='').exists()
@@ -798,26 +677,26 @@ class CustomerByIdByLeadStatusView(APIView):
         
         # Check lead status conditions
         has_any_lead = Lead.objects.filter(
-            tenant=request.user.tenant,
+            tenant=tenant,
             customer_id=customer.id
         ).exists()
         
         has_follow_up_lead = Lead.objects.filter(
-            tenant=request.user.tenant,
+            tenant=tenant,
             customer_id=customer.id,
             status=LeadStatus.FOLLOW_UP,
             is_active=True
         ).exists()
         
         has_new_lead = Lead.objects.filter(
-            tenant=request.user.tenant,
+            tenant=tenant,
             customer_id=customer.id,
             status=LeadStatus.NEW,
             is_active=True
         ).exists()
         
         has_interested_lead = Lead.objects.filter(
-            tenant=request.user.tenant,
+            tenant=tenant,
             customer_id=customer.id,
             status=LeadStatus.INTERESTED,
             is_active=True
@@ -839,7 +718,7 @@ class CustomerByIdByLeadStatusView(APIView):
         
         # Annotate with lead phone for serializer (use lead phone if customer phone is missing)
         lead_phone_subquery = Lead.objects.filter(
-            tenant=request.user.tenant,
+            tenant=tenant,
             customer_id=customer.id,
             phone__isnull=False
         ).exclude(phone='').order_by('-created_at').values('phone')[:1]
@@ -849,7 +728,7 @@ class CustomerByIdByLeadStatusView(APIView):
             lead_phone=Subquery(lead_phone_subquery)
         )
         # Add is_lead_created and last_call_time annotations
-        customer_queryset = annotate_customer_queryset(customer_queryset, request.user.tenant)
+        customer_queryset = self.serializer_class.setup_eager_loading(customer_queryset, tenant)
         customer_with_annotation = customer_queryset.first()
         
         # Annotate with lead status for serializer context
@@ -886,7 +765,7 @@ class CustomerByIdByLeadStatusView(APIView):
                 'Content-Type': 'application/json',
                 'ngrok-skip-browser-warning': 'true'  # Bypass ngrok warning page
             }
-            response = requests.post(
+            response = campaign_api_session.post(
                 external_api_url,
                 json=payload,
                 headers=headers,
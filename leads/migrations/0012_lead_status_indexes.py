@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-16 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0011_alter_leadcallsummary_call_outcome'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['tenant', 'customer', 'is_active', 'status'], name='leads_lead_tenant__2b9592_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadcallsummary',
+            index=models.Index(fields=['tenant', 'lead', 'is_active', 'call_time'], name='leads_leadc_tenant__2c9df0_idx'),
+        ),
+    ]
@@ -32,6 +32,7 @@ class Lead(TimestampedModel):
             models.Index(fields=['tenant', 'name']),
             models.Index(fields=['tenant', 'email']),
             models.Index(fields=['tenant', 'status']),
+            models.Index(fields=['tenant', 'customer', 'is_active', 'status']),
         ]
 
     def __str__(self):
@@ -118,6 +119,7 @@ class LeadCallSummary(TimestampedModel):
             models.Index(fields=['tenant', 'lead', 'created_at']),
             models.Index(fields=['tenant', 'created_at']),
             models.Index(fields=['call_outcome']),
+            models.Index(fields=['tenant', 'lead', 'is_active', 'call_time']),
         ]
 
     def __str__(self):
@@ -1,20 +1,34 @@
+from functools import lru_cache
+
 from django.db.models.signals import post_save, pre_save, pre_delete
 from django.dispatch import receiver
 from .models import Lead, LeadHistory, LeadCallSummary
 import json
 
 
+@lru_cache(maxsize=None)
+def _field_kind(model, field_name):
+    """Resolve (kind, attribute) for a tracked field once per model instead of on every save"""
+    field = model._meta.get_field(field_name)
+    if field.many_to_one:  # ForeignKey
+        return 'fk', field.attname
+    if field.many_to_many:
+        return 'm2m', field_name
+    return 'scalar', field_name
+
+
 def get_field_value(obj, field_name):
     """Safely get field value, handling ForeignKeys and special fields"""
     try:
-        field = obj._meta.get_field(field_name)
-        if field.many_to_one:  # ForeignKey
-            value = getattr(obj, field_name)
-            return str(value.id) if value else None
-        elif field.many_to_many:
-            return [str(item.id) for item in getattr(obj, field_name).all()]
+        kind, attname = _field_kind(type(obj), field_name)
+        if kind == 'fk':
+            # Read the raw <field>_id column instead of loading the related row
+            value = getattr(obj, attname)
+            return str(value) if value is not None else None
+        elif kind == 'm2m':
+            return [str(item.id) for item in getattr(obj, attname).all()]
         else:
-            value = getattr(obj, field_name)
+            value = getattr(obj, attname)
             # Convert to string for storage, handling None
             if value is None:
                 return None
@@ -52,11 +66,6 @@ def lead_post_save(sender, instance, created, **kwargs):
     
     tenant = instance.tenant
     
-    # Ensure we're in the tenant database context
-    from django.db import connections
-    if hasattr(connections['default'], 'tenant'):
-        connections['default'].tenant = tenant
-    
     if created:
         # Record creation
         LeadHistory.objects.create(
@@ -161,11 +170,6 @@ def lead_call_summary_post_save(sender, instance, created, **kwargs):
     lead = instance.lead
     tenant = instance.tenant
     
-    # Ensure we're in the tenant database context
-    from django.db import connections
-    if hasattr(connections['default'], 'tenant'):
-        connections['default'].tenant = tenant
-    
     if created:
         # Record call summary creation
         summary_text = instance.summary or ""
@@ -265,11 +269,6 @@ def lead_call_summary_pre_delete(sender, instance, **kwargs):
     lead = instance.lead
     tenant = instance.tenant
     
-    # Ensure we're in the tenant database context
-    from django.db import connections
-    if hasattr(connections['default'], 'tenant'):
-        connections['default'].tenant = tenant
-    
     # Get the user - try to get from instance if available
     changed_by = None
     if hasattr(instance, '_changed_by'):
@@ -6,16 +6,25 @@ from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.utils.decorators import method_decorator
- 
+from django.db.models import Prefetch
 
 from .models import Lead, LeadHistory, LeadCallSummary
 from customer.models import Customer
+from customer.serializers import CustomerSerializer
 from .serializers import LeadSerializer, LeadStatusUpdateSerializer, LeadCallSummarySerializer
 from .history_serializers import LeadHistorySerializer
-from user.models import CustomUser
+from user.mixins import TenantContextMixin
 from .importer import detect_and_parse_tabular, normalize_lead_row
 
 
+def prefetch_customer_details(tenant):
+    """
+    Load each lead's customer with the annotations its nested CustomerSerializer reads, in one
+    extra query per page instead of several per lead.
+    """
+    return Prefetch('customer', queryset=CustomerSerializer.setup_eager_loading(Customer.objects.all(), tenant))
+
+
 @method_decorator(
     name='get',
     decorator=swagger_auto_schema(
@@ -66,7 +75,7 @@ from .importer import detect_and_parse_tabular, normalize_lead_row
         },
     ),
 )
-class LeadListCreateView(generics.ListCreateAPIView):
+class LeadListCreateView(TenantContextMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = LeadSerializer
     filter_backends = [filters.SearchFilter]
@@ -74,14 +83,13 @@ class LeadListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         # Scope to current tenant
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             return Lead.objects.none()
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         # Default ordering: newest first
         return (
-            Lead.objects.filter(tenant=self.request.user.tenant, is_active=True)
-            .select_related('customer')
+            Lead.objects.filter(tenant=tenant, is_active=True)
+            .prefetch_related(prefetch_customer_details(tenant))
             .order_by('-created_at')
         )
 
@@ -89,15 +97,12 @@ class LeadListCreateView(generics.ListCreateAPIView):
     def create(self, request, *args, **kwargs):
         if not request.user or not request.user.is_authenticated:
             return Response({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        if not hasattr(request.user, 'tenant') or not request.user.tenant:
+        tenant = request.tenant
+        if not tenant:
             return Response({'detail': 'No tenant associated'}, status=status.HTTP_400_BAD_REQUEST)
-        from django.db import connections
-        connections['default'].tenant = request.user.tenant
 
-        # Resolve a user that actually exists inside the current tenant DB.
-        # If the authenticated user hasn't been copied into the tenant DB yet,
-        # fall back to None to avoid FK errors.
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
+        # Ensure user exists inside tenant DB context
+        tenant_user = self.get_tenant_user()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         validated = dict(serializer.validated_data)
@@ -110,7 +115,7 @@ class LeadListCreateView(generics.ListCreateAPIView):
         # Validate customer if provided by ID
         if customer:
             # Ensure customer belongs to the same tenant
-            if customer.tenant != request.user.tenant:
+            if customer.tenant_id != tenant.pk:
                 return Response(
                     {'detail': 'Customer does not belong to the current tenant'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -124,10 +129,10 @@ class LeadListCreateView(generics.ListCreateAPIView):
         if not customer and customer_email:
             # Ensure we operate in the tenant database
             try:
-                customer = Customer.objects.get(tenant=request.user.tenant, email=customer_email, is_active=True)
+                customer = Customer.objects.get(tenant=tenant, email=customer_email, is_active=True)
             except Customer.DoesNotExist:
                 customer = Customer.objects.create(
-                    tenant=request.user.tenant,
+                    tenant=tenant,
                     created_by=tenant_user,
                     name=customer_name or validated.get('name') or customer_email.split('@')[0],
                     email=customer_email,
@@ -135,11 +140,11 @@ class LeadListCreateView(generics.ListCreateAPIView):
                 )
             except Customer.MultipleObjectsReturned:
                 # Handle duplicate emails (shouldn't happen due to unique constraint, but handle gracefully)
-                customer = Customer.objects.filter(tenant=request.user.tenant, email=customer_email, is_active=True).first()
+                customer = Customer.objects.filter(tenant=tenant, email=customer_email, is_active=True).first()
 
         lead = Lead(
-            tenant=request.user.tenant,
-            created_by=tenant_user,  # may be None if user isn't present in tenant DB
+            tenant=tenant,
+            created_by=tenant_user,  # None if the user couldn't be mirrored into the tenant DB
             customer=customer,
             **validated,
         )
@@ -203,39 +208,36 @@ class LeadListCreateView(generics.ListCreateAPIView):
         },
     ),
 )
-class LeadDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LeadDetailView(TenantContextMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = LeadSerializer
     lookup_field = 'pk'
     http_method_names = ['get', 'patch', 'delete']  # Exclude PUT
 
     def get_queryset(self):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             return Lead.objects.none()
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
-        return Lead.objects.filter(tenant=self.request.user.tenant, is_active=True).select_related('customer')
+        return Lead.objects.filter(tenant=tenant, is_active=True).prefetch_related(
+            prefetch_customer_details(tenant)
+        )
 
     def perform_update(self, serializer):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        if not self.request.tenant:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({'detail': 'No tenant associated with user'})
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=self.request.user.id).first()
+        tenant_user = self.get_tenant_user()
         instance = serializer.instance
         instance._changed_by = tenant_user
         serializer.save()
 
     def delete(self, request, *args, **kwargs):
-        if not hasattr(request.user, 'tenant') or not request.user.tenant:
+        if not request.tenant:
             return Response({'detail': 'No tenant associated with user'}, status=status.HTTP_400_BAD_REQUEST)
         instance = self.get_object()
-        from django.db import connections
-        connections['default'].tenant = request.user.tenant
         # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
+        tenant_user = self.get_tenant_user()
         instance.is_active = False
         instance._changed_by = tenant_user
         instance.save(update_fields=['is_active', 'updated_at'])
@@ -265,7 +267,7 @@ class LeadDetailView(generics.RetrieveUpdateDestroyAPIView):
         },
     ),
 )
-class LeadStatusUpdateView(generics.UpdateAPIView):
+class LeadStatusUpdateView(TenantContextMixin, generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = LeadStatusUpdateSerializer
     lookup_field = 'pk'
@@ -274,22 +276,19 @@ class LeadStatusUpdateView(generics.UpdateAPIView):
     swagger_schema_fields = {"tags": ["Leads"]}
 
     def get_queryset(self):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             return Lead.objects.none()
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
-        return Lead.objects.filter(tenant=self.request.user.tenant, is_active=True)
+        return Lead.objects.filter(tenant=tenant, is_active=True)
 
     def patch(self, request, *args, **kwargs):
-        if not hasattr(request.user, 'tenant') or not request.user.tenant:
+        if not request.tenant:
             return Response({'detail': 'No tenant associated with user'}, status=status.HTTP_400_BAD_REQUEST)
-        from django.db import connections
-        connections['default'].tenant = request.user.tenant
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
+        tenant_user = self.get_tenant_user()
         instance._changed_by = tenant_user
         serializer.save()
         return Response(LeadSerializer(instance, context={'request': request}).data, status=status.HTTP_200_OK)
@@ -326,37 +325,23 @@ class LeadStatusUpdateView(generics.UpdateAPIView):
         },
     ),
 )
-class LeadImportView(APIView):
+class LeadImportView(TenantContextMixin, APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request, *args, **kwargs):
         if not request.user or not request.user.is_authenticated:
             return Response({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        if not getattr(request.user, 'tenant', None):
+        tenant = request.tenant
+        if not tenant:
             return Response({'detail': 'No tenant associated'}, status=status.HTTP_400_BAD_REQUEST)
 
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'detail': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        from django.db import connections
-        connections['default'].tenant = request.user.tenant
-
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
-        if not tenant_user:
-            tenant_user = CustomUser.objects.create(
-                id=request.user.id,
-                username=request.user.username,
-                email=request.user.email,
-                first_name=request.user.first_name,
-                last_name=request.user.last_name,
-                is_active=request.user.is_active,
-                is_staff=request.user.is_staff,
-                is_superuser=request.user.is_superuser,
-                password=request.user.password,
-                tenant=request.user.tenant,
-            )
+        # Ensure user exists inside tenant DB context
+        tenant_user = self.get_tenant_user()
 
         try:
             rows, _fmt = detect_and_parse_tabular(file_obj, file_obj.name)
@@ -385,7 +370,7 @@ class LeadImportView(APIView):
                     try:
                         # Try to link any existing customer by email (regardless of active flag)
                         customer = Customer.objects.get(
-                            tenant=request.user.tenant, email=cust_email
+                            tenant=tenant, email=cust_email
                         )
                         # Optionally re-activate if auto-create is on and record is inactive
                         if auto_create_customer and customer.is_active is False:
@@ -395,7 +380,7 @@ class LeadImportView(APIView):
                         if auto_create_customer:
                             # Auto-create minimal customer when enabled
                             customer = Customer.objects.create(
-                                tenant=request.user.tenant,
+                                tenant=tenant,
                                 created_by=tenant_user,
                                 name=(cust_name or cust_email.split('@')[0]),
                                 email=cust_email,
@@ -405,7 +390,7 @@ class LeadImportView(APIView):
                             customer = None
 
                 lead = Lead(
-                    tenant=request.user.tenant,
+                    tenant=tenant,
                     created_by=tenant_user,
                     customer=customer,
                     name=name,
@@ -482,30 +467,28 @@ class LeadImportView(APIView):
         },
     ),
 )
-class LeadHistoryView(generics.ListAPIView):
+class LeadHistoryView(TenantContextMixin, generics.ListAPIView):
     """API endpoint to retrieve history of changes for a specific lead"""
     permission_classes = [IsAuthenticated]
     serializer_class = LeadHistorySerializer
     lookup_field = 'pk'
 
     def get_queryset(self):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             return LeadHistory.objects.none()
         
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
-        
         lead_id = self.kwargs.get('pk')
         
         # Verify lead exists and belongs to tenant
         try:
-            lead = Lead.objects.get(id=lead_id, tenant=self.request.user.tenant)
+            lead = Lead.objects.get(id=lead_id, tenant=tenant)
         except Lead.DoesNotExist:
             return LeadHistory.objects.none()
         
         return LeadHistory.objects.filter(
             lead=lead,
-            tenant=self.request.user.tenant
+            tenant=tenant
         ).select_related('changed_by').order_by('-created_at')
 
 
@@ -523,37 +506,35 @@ class LeadHistoryView(generics.ListAPIView):
         operation_description='Create a call summary for a lead',
     ),
 )
-class LeadCallSummaryListCreateView(generics.ListCreateAPIView):
+class LeadCallSummaryListCreateView(TenantContextMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = LeadCallSummarySerializer
 
     def get_queryset(self):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             return LeadCallSummary.objects.none()
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         lead_id = self.kwargs.get('pk')
         return LeadCallSummary.objects.filter(
-            tenant=self.request.user.tenant,
+            tenant=tenant,
             lead_id=lead_id,
             is_active=True,
         ).order_by('-created_at')
 
     def perform_create(self, serializer):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({'detail': 'No tenant associated with user'})
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         lead_id = self.kwargs.get('pk')
         try:
-            lead = Lead.objects.get(id=lead_id, tenant=self.request.user.tenant, is_active=True)
+            lead = Lead.objects.get(id=lead_id, tenant=tenant, is_active=True)
         except Lead.DoesNotExist:
             from rest_framework.exceptions import NotFound
             raise NotFound('Lead not found')
-        tenant_user = CustomUser.objects.filter(id=self.request.user.id).first()
+        tenant_user = self.get_tenant_user()
         # Save instance - signal will use created_by for history tracking on create
-        serializer.save(tenant=self.request.user.tenant, lead=lead, created_by=tenant_user)
+        serializer.save(tenant=tenant, lead=lead, created_by=tenant_user)
 
 
 @method_decorator(
@@ -577,20 +558,19 @@ class LeadCallSummaryListCreateView(generics.ListCreateAPIView):
         operation_description='Soft delete a call summary',
     ),
 )
-class LeadCallSummaryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LeadCallSummaryDetailView(TenantContextMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = LeadCallSummarySerializer
     lookup_field = 'summary_id'
     http_method_names = ['get', 'patch', 'delete']
 
     def get_queryset(self):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        tenant = self.request.tenant
+        if not tenant:
             return LeadCallSummary.objects.none()
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         lead_id = self.kwargs.get('pk')
         return LeadCallSummary.objects.filter(
-            tenant=self.request.user.tenant,
+            tenant=tenant,
             lead_id=lead_id,
             is_active=True,
         )
@@ -604,25 +584,21 @@ class LeadCallSummaryDetailView(generics.RetrieveUpdateDestroyAPIView):
         return obj
 
     def perform_update(self, serializer):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        if not self.request.tenant:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({'detail': 'No tenant associated with user'})
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=self.request.user.id).first()
+        tenant_user = self.get_tenant_user()
         instance = serializer.instance
         instance._changed_by = tenant_user
         serializer.save()
 
     def perform_destroy(self, instance):
-        if not hasattr(self.request.user, 'tenant') or not self.request.user.tenant:
+        if not self.request.tenant:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({'detail': 'No tenant associated with user'})
-        from django.db import connections
-        connections['default'].tenant = self.request.user.tenant
         # Get tenant user for history tracking
-        tenant_user = CustomUser.objects.filter(id=self.request.user.id).first()
+        tenant_user = self.get_tenant_user()
         instance._changed_by = tenant_user
         instance.is_active = False
         instance.save(update_fields=['is_active', 'updated_at'])
@@ -644,37 +620,35 @@ class LeadCallSummaryDetailView(generics.RetrieveUpdateDestroyAPIView):
         },
     ),
 )
-class CustomerCallSummaryCreateView(APIView):
+class CustomerCallSummaryCreateView(TenantContextMixin, APIView):
     """Create a call summary for a customer by customer ID"""
     permission_classes = [IsAuthenticated]
     
     def post(self, request, customer_id):
-        if not hasattr(request.user, 'tenant') or not request.user.tenant:
+        tenant = request.tenant
+        if not tenant:
             return Response({'detail': 'No tenant associated with user'}, status=status.HTTP_400_BAD_REQUEST)
         
-        from django.db import connections
-        connections['default'].tenant = request.user.tenant
-        
         # Get customer
         try:
-            customer = Customer.objects.get(id=customer_id, tenant=request.user.tenant, is_active=True)
+            customer = Customer.objects.get(id=customer_id, tenant=tenant, is_active=True)
         except Customer.DoesNotExist:
             return Response({'detail': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
         
         # Find existing lead for this customer (if exists, we'll update its status)
         # Only create a new lead if none exists
         lead = Lead.objects.filter(
-            tenant=request.user.tenant,
+            tenant=tenant,
             customer=customer,
             is_active=True
         ).order_by('-created_at').first()
         
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
+        tenant_user = self.get_tenant_user()
         
         if not lead:
             # No existing lead found, create a new one for this customer
             lead = Lead.objects.create(
-                tenant=request.user.tenant,
+                tenant=tenant,
                 customer=customer,
                 name=customer.name,
                 email=customer.email,
@@ -692,9 +666,9 @@ class CustomerCallSummaryCreateView(APIView):
         serializer = LeadCallSummarySerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        tenant_user = CustomUser.objects.filter(id=request.user.id).first()
+        tenant_user = self.get_tenant_user()
         call_summary = serializer.save(
-            tenant=request.user.tenant,
+            tenant=tenant,
             lead=lead,
             created_by=tenant_user
         )
@@ -59,8 +59,8 @@ class DatabaseService:
                     },
                     'ATOMIC_REQUESTS': False,
                     'AUTOCOMMIT': True,
-                    'CONN_HEALTH_CHECKS': False,
-                    'CONN_MAX_AGE': 0,
+                    'CONN_HEALTH_CHECKS': settings.DATABASES['default'].get('CONN_HEALTH_CHECKS', False),
+                    'CONN_MAX_AGE': getattr(settings, 'TENANT_DB_CONN_MAX_AGE', 0),
                     'TIME_ZONE': None,
                     'TEST': {
                         'CHARSET': None,
@@ -120,8 +120,8 @@ class DatabaseService:
             },
             'ATOMIC_REQUESTS': False,
             'AUTOCOMMIT': True,
-            'CONN_HEALTH_CHECKS': False,
-            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': settings.DATABASES['default'].get('CONN_HEALTH_CHECKS', False),
+            'CONN_MAX_AGE': getattr(settings, 'TENANT_DB_CONN_MAX_AGE', 0),
             'TIME_ZONE': None,
             'TEST': {
                 'CHARSET': None,
@@ -0,0 +1,90 @@
+import logging
+
+from django.core.cache import cache
+from django.db import IntegrityError, connections, router, transaction
+
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+# How long a tenant database is remembered as already holding a user's mirror row
+TENANT_USER_CACHE_TIMEOUT = 60 * 60
+
+
+def tenant_user_cache_key(db_alias, user_id):
+    return f'tenant_user:{db_alias}:{user_id}'
+
+
+def _mirrored_fields(user):
+    """Columns of ``user`` copied onto its tenant DB mirror"""
+    return {
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_active': user.is_active,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        'password': user.password,
+    }
+
+
+def _clone_user_to_tenant(user):
+    """Build the tenant DB mirror of ``user``; it keeps the same primary key so FKs line up"""
+    return CustomUser(id=user.id, tenant=None, **_mirrored_fields(user))
+
+
+def get_or_create_tenant_user(user):
+    """
+    Return the tenant DB copy of ``user``, mirroring it on first use (avoids FK issues in tenant
+    DB context). Returns None when the mirror row can't be created, so FKs are left empty.
+
+    Each cache miss also re-copies the user's fields onto an existing mirror; the post_save
+    receiver in user.signals clears the cached flag when a user is edited, so edits reach the
+    mirror on that user's next request.
+    """
+    db_alias = router.db_for_write(CustomUser)
+    cache_key = tenant_user_cache_key(db_alias, user.id)
+    if not cache.get(cache_key):
+        # An INSERT that is skipped when the mirror already exists, so two requests racing to
+        # create it don't fail on the duplicate key
+        CustomUser.objects.bulk_create([_clone_user_to_tenant(user)], ignore_conflicts=True)
+        # Refresh a mirror that predates the user's latest edit. The matched-row count also
+        # confirms the row exists: MySQL's INSERT IGNORE swallows other conflicts too (e.g.
+        # another row holding the username), so the flag is only cached once it does
+        try:
+            with transaction.atomic(using=db_alias):
+                mirrored = CustomUser.objects.filter(pk=user.id).update(**_mirrored_fields(user))
+        except IntegrityError:
+            # The refreshed values clash with another row; keep the existing mirror as it is
+            mirrored = CustomUser.objects.filter(pk=user.id).exists()
+        if not mirrored:
+            logger.warning('Could not mirror user %s into tenant database %s', user.id, db_alias)
+            return None
+        cache.set(cache_key, True, TENANT_USER_CACHE_TIMEOUT)
+    # The mirror row shares the user's primary key, so ``user`` satisfies the tenant FKs as-is
+    return user
+
+
+class TenantContextMixin:
+    """
+    Bind the database router to the authenticated user's tenant once per request.
+
+    DRF authenticates lazily inside the view (token auth), so Django middleware runs too
+    early to see the user; hooking perform_authentication sets the tenant right after the
+    user is resolved and before any queryset or handler code runs. The tenant is also
+    exposed as ``request.tenant`` (None when the user has none).
+    """
+
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+        request.tenant = tenant = getattr(request.user, 'tenant', None)
+        if tenant:
+            connections['default'].tenant = tenant
+
+    def get_tenant_user(self):
+        """Return the tenant DB user for this request, resolved at most once"""
+        request = self.request
+        if not hasattr(request, '_tenant_user'):
+            request._tenant_user = get_or_create_tenant_user(request.user)
+        return request._tenant_user
@@ -0,0 +1,26 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .mixins import tenant_user_cache_key
+from .models import CustomUser, Tenant
+
+
+@receiver(post_delete, sender=CustomUser)
+def forget_tenant_user(sender, instance, using, **kwargs):
+    """Drop the cached mirror flag so the next request re-creates the tenant DB user"""
+    cache.delete(tenant_user_cache_key(using, instance.id))
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_tenant_user(sender, instance, created, using, **kwargs):
+    """Drop the cached mirror flag on edit so the next request copies the changes to the tenant DB user"""
+    if created:
+        return
+    keys = [tenant_user_cache_key(using, instance.id)]
+    if instance.tenant_id:
+        # Users are edited in the main database, but the flag is keyed by the tenant's alias
+        database_name = Tenant.objects.filter(pk=instance.tenant_id).values_list('database_name', flat=True).first()
+        if database_name:
+            keys.append(tenant_user_cache_key(database_name, instance.id))
+    cache.delete_many(keys)